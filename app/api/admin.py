@@ -0,0 +1,57 @@
+"""
+Operational endpoints: slow-query summary and response cache counters
+
+The router is only mounted when an admin token is configured
+(LEADTOOL_ADMIN_TOKEN, or admin.token in settings.yaml), and every
+request must send that token in the X-Admin-Token header.
+"""
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+
+from app.config import load_config
+from app.monitoring.slow_queries import get_recorder
+
+
+def get_admin_token():
+    """Configured admin token, or None when the admin endpoints are disabled"""
+    return os.getenv('LEADTOOL_ADMIN_TOKEN') or (load_config('settings').get('admin') or {}).get('token')
+
+
+async def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Reject requests without the admin token (constant-time comparison)"""
+    token = get_admin_token()
+    if not token or x_admin_token is None or not hmac.compare_digest(
+        x_admin_token.encode('utf-8'), token.encode('utf-8')
+    ):
+        raise HTTPException(status_code=401, detail="Invalid or missing admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/admin/slow-queries")
+async def slow_queries(limit: int = Query(20, ge=1, le=500)):
+    """Slowest statements since startup, by total time"""
+    recorder = get_recorder()
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="Slow-query log is disabled")
+    return {"threshold_ms": recorder.threshold * 1000, "statements": recorder.top(limit)}
+
+
+@router.delete("/admin/slow-queries")
+async def reset_slow_queries():
+    """Clear the slow-query totals (the log file is kept)"""
+    recorder = get_recorder()
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="Slow-query log is disabled")
+    recorder.reset()
+    return {"message": "Slow-query statistics cleared"}
+
+
+@router.get("/cache/stats")
+async def cache_stats(request: Request):
+    """Response cache hit-rate counters"""
+    return request.app.state.response_cache.stats()
@@ -0,0 +1,410 @@
+"""
+Bulk create/update/delete endpoints for companies and contacts
+
+Request bodies are a JSON array or an NDJSON stream (Content-Type
+application/x-ndjson). Records are processed in chunks, each chunk with a
+handful of set-based statements in its own transaction, and every input
+row gets a result entry (index, status, id or error).
+"""
+import logging
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.api.serialization import ORJSONResponse
+from app.models.changes import record_changes, record_company_deletes
+from app.models.database import Company, CompanyMetric, Contact, MonthlyData, get_db
+from app.models.geo import encode_geohash
+from app.models.rollups import refresh_after_write
+from app.models.schemas import CompanyCreate, CompanyUpdate, ContactCreate, ContactUpdate
+from app.models.versions import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+BULK_CHUNK_SIZE = 1000
+
+
+class InvalidLine:
+    """Placeholder for an NDJSON line that is not valid JSON"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+async def iter_records(request):
+    """Yield records from a JSON array body or an NDJSON stream"""
+    content_type = request.headers.get('content-type', '')
+    if 'ndjson' in content_type or 'jsonl' in content_type:
+        buffer = b''
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                if line.strip():
+                    yield _parse_line(line)
+        if buffer.strip():
+            yield _parse_line(buffer)
+        return
+
+    try:
+        records = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or an NDJSON stream")
+    for record in records:
+        yield record
+
+
+def _parse_line(line):
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        return InvalidLine(str(e))
+
+
+async def iter_chunks(request, size=BULK_CHUNK_SIZE):
+    """Yield lists of (index, record) of at most size items"""
+    chunk = []
+    index = 0
+    async for record in iter_records(request):
+        chunk.append((index, record))
+        index += 1
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _error(index, error):
+    return {"index": index, "status": "error", "error": error}
+
+
+def _validate(index, record, schema):
+    """Return (values, None) or (None, error result) for one record"""
+    if isinstance(record, InvalidLine):
+        return None, _error(index, f"Invalid JSON: {record.error}")
+    if not isinstance(record, dict):
+        return None, _error(index, "Expected a JSON object")
+    try:
+        return schema.model_validate(record).model_dump(exclude_unset=True), None
+    except ValidationError as e:
+        return None, _error(index, e.errors(include_url=False, include_context=False))
+
+
+def _record_id(index, record):
+    """Return (id, None) or (None, error result) for a record naming a row id"""
+    if isinstance(record, dict):
+        record = record.get('id')
+    if isinstance(record, int) and not isinstance(record, bool):
+        return record, None
+    return None, _error(index, "Expected an integer id")
+
+
+def _insert_row(values, schema, defaults=None):
+    """Full parameter set for an insert (executemany needs uniform keys)"""
+    row = {field: values.get(field) for field in schema.model_fields}
+    for field, default in (defaults or {}).items():
+        if row[field] is None:
+            row[field] = default
+    return row
+
+
+def _with_geohash(values):
+    """Add the geohash for rows written without ORM events"""
+    if values.get('latitude') is not None and values.get('longitude') is not None:
+        values['geohash'] = encode_geohash(values['latitude'], values['longitude'])
+    else:
+        values['geohash'] = None
+    return values
+
+
+def _refresh_geohashes(db, ids):
+    """Recompute geohashes after a bulk update touched coordinates"""
+    rows = db.execute(
+        select(Company.id, Company.latitude, Company.longitude).where(Company.id.in_(ids))
+    ).all()
+    if rows:
+        db.execute(update(Company), [
+            {"id": row.id, "geohash": _with_geohash({"latitude": row.latitude, "longitude": row.longitude}).get('geohash')}
+            for row in rows
+        ])
+
+
+def _summary(results):
+    """Response body with per-row results and counts per status"""
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return ORJSONResponse({"counts": counts, "results": results})
+
+
+def upsert_companies(db, chunk):
+    """Insert new companies and update existing ones (matched by name)"""
+    results = {}
+    valid = []
+    for index, record in chunk:
+        values, error = _validate(index, record, CompanyCreate)
+        if error:
+            results[index] = error
+        else:
+            valid.append((index, values))
+
+    names = {values['name'] for _, values in valid}
+    existing = dict(
+        db.execute(select(Company.name, Company.id).where(Company.name.in_(names))).all()
+    ) if names else {}
+
+    inserts = {}
+    updates = {}
+    repeated = []
+    for index, values in valid:
+        name = values['name']
+        if name in existing:
+            updates.setdefault(existing[name], {"id": existing[name]}).update(values)
+            results[index] = {"index": index, "status": "updated", "id": existing[name]}
+        elif name in inserts:
+            # Repeated name within the chunk: later values win
+            inserts[name][1].update(values)
+            repeated.append((index, name))
+            results[index] = {"index": index, "status": "updated"}
+        else:
+            inserts[name] = (index, values)
+            results[index] = {"index": index, "status": "created"}
+
+    if inserts:
+        created = db.execute(
+            insert(Company).returning(Company.id, Company.name),
+            [
+                _with_geohash(_insert_row(values, CompanyCreate, {'source': 'Google Maps'}))
+                for _, values in inserts.values()
+            ]
+        ).all()
+        ids = {name: company_id for company_id, name in created}
+        for name, (index, _) in inserts.items():
+            results[index]["id"] = ids[name]
+        for index, name in repeated:
+            results[index]["id"] = ids[name]
+        record_changes(db, 'companies', 'insert', [ids[name] for name in inserts])
+
+    if updates:
+        db.execute(update(Company), list(updates.values()))
+        record_changes(db, 'companies', 'update', list(updates))
+        geo_ids = [row["id"] for row in updates.values() if 'latitude' in row or 'longitude' in row]
+        if geo_ids:
+            _refresh_geohashes(db, geo_ids)
+
+    return [results[index] for index, _ in chunk]
+
+
+def patch_rows(db, chunk, model, schema):
+    """Update existing rows by id with the provided fields"""
+    results = {}
+    rows = {}
+    for index, record in chunk:
+        row_id, error = _record_id(index, record)
+        if error is None and not isinstance(record, dict):
+            error = _error(index, "Expected a JSON object with an id")
+        if error is None:
+            values, error = _validate(index, {k: v for k, v in record.items() if k != 'id'}, schema)
+        if error:
+            results[index] = error
+            continue
+        rows.setdefault(row_id, {"id": row_id}).update(values)
+        results[index] = {"index": index, "status": "updated", "id": row_id}
+
+    found = set(db.execute(select(model.id).where(model.id.in_(list(rows)))).scalars()) if rows else set()
+    for index, result in results.items():
+        if result["status"] == "updated" and result["id"] not in found:
+            results[index] = {"index": index, "status": "not_found", "id": result["id"]}
+
+    changes = [values for row_id, values in rows.items() if row_id in found and len(values) > 1]
+    if changes:
+        db.execute(update(model), changes)
+        record_changes(db, model.__tablename__, 'update', [row["id"] for row in changes])
+        if model is Company:
+            geo_ids = [row["id"] for row in changes if 'latitude' in row or 'longitude' in row]
+            if geo_ids:
+                _refresh_geohashes(db, geo_ids)
+
+    return [results[index] for index, _ in chunk]
+
+
+def delete_rows(db, chunk, model, month_keys=None):
+    """Delete rows by id (companies take their dependent rows with them)
+
+    Months whose company counts change are added to month_keys.
+    """
+    results = {}
+    ids = set()
+    for index, record in chunk:
+        row_id, error = _record_id(index, record)
+        if error:
+            results[index] = error
+        else:
+            ids.add(row_id)
+            results[index] = {"index": index, "status": "deleted", "id": row_id}
+
+    found = set(db.execute(select(model.id).where(model.id.in_(ids))).scalars()) if ids else set()
+    if found:
+        if model is Company:
+            record_company_deletes(db, sorted(found))
+            if month_keys is not None:
+                month_keys.update(db.execute(
+                    select(MonthlyData.month_key).where(
+                        MonthlyData.company_id.in_(found), MonthlyData.data_type == 'company'
+                    ).distinct()
+                ).scalars())
+            for child in (Contact, MonthlyData, CompanyMetric):
+                db.execute(delete(child).where(child.company_id.in_(found)))
+        else:
+            record_changes(db, model.__tablename__, 'delete', sorted(found))
+        db.execute(delete(model).where(model.id.in_(found)))
+
+    for index, result in results.items():
+        if result["status"] == "deleted" and result["id"] not in found:
+            results[index] = {"index": index, "status": "not_found", "id": result["id"]}
+    return [results[index] for index, _ in chunk]
+
+
+def upsert_contacts(db, chunk):
+    """Insert contacts, updating existing ones matched by (company_id, phone)"""
+    results = {}
+    valid = []
+    for index, record in chunk:
+        values, error = _validate(index, record, ContactCreate)
+        if error:
+            results[index] = error
+        else:
+            valid.append((index, values))
+
+    company_ids = {values['company_id'] for _, values in valid}
+    known = set(db.execute(select(Company.id).where(Company.id.in_(company_ids))).scalars()) if company_ids else set()
+    keys = {(values['company_id'], values['phone']) for _, values in valid if values.get('phone')}
+    existing = dict(
+        ((company_id, phone), contact_id) for contact_id, company_id, phone in db.execute(
+            select(Contact.id, Contact.company_id, Contact.phone)
+            .where(tuple_(Contact.company_id, Contact.phone).in_(keys))
+        ).all()
+    ) if keys else {}
+
+    inserts = []
+    pending = {}
+    repeated = []
+    updates = {}
+    for index, values in valid:
+        if values['company_id'] not in known:
+            results[index] = _error(index, "Company not found")
+            continue
+        key = (values['company_id'], values.get('phone'))
+        if key in existing:
+            updates.setdefault(existing[key], {"id": existing[key]}).update(values)
+            results[index] = {"index": index, "status": "updated", "id": existing[key]}
+        elif values.get('phone') and key in pending:
+            # Repeated contact within the chunk: later values win
+            inserts[pending[key]][1].update(values)
+            repeated.append((index, pending[key]))
+            results[index] = {"index": index, "status": "updated"}
+        else:
+            pending[key] = len(inserts)
+            inserts.append((index, values))
+            results[index] = {"index": index, "status": "created"}
+
+    if inserts:
+        rows = [_insert_row(values, ContactCreate, {'is_primary': False}) for _, values in inserts]
+        fields = list(ContactCreate.model_fields)
+        # Ordered RETURNING (which ORM inserts ask for) needs a sentinel column SQLite
+        # lacks and degrades to one INSERT per row. Contacts have no natural key, so a
+        # Core insert returns the inserted values and ids are mapped back by those;
+        # identical rows are interchangeable, so either id may go to either of them.
+        positions = {}
+        for position, row in enumerate(rows):
+            positions.setdefault(tuple(row[field] for field in fields), []).append(position)
+        table = Contact.__table__
+        created = [None] * len(rows)
+        for contact_id, *inserted in db.execute(
+            insert(table).returning(table.c.id, *(table.c[field] for field in fields)), rows
+        ):
+            created[positions[tuple(inserted)].pop()] = contact_id
+        for (index, _), contact_id in zip(inserts, created):
+            results[index]["id"] = contact_id
+        for index, position in repeated:
+            results[index]["id"] = created[position]
+        record_changes(db, 'contacts', 'insert', created)
+
+    if updates:
+        db.execute(update(Contact), list(updates.values()))
+        record_changes(db, 'contacts', 'update', list(updates))
+
+    return [results[index] for index, _ in chunk]
+
+
+async def _run_bulk(request, db, operation, entities, month_keys=()):
+    """Apply operation chunk by chunk, committing each chunk, then refresh the entities' stats rollups"""
+    results = []
+    async for chunk in iter_chunks(request):
+        try:
+            # Bump first: it serializes writers, keeping change log ids in commit order
+            bump_data_version(db)
+            chunk_results = operation(db, chunk)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Bulk chunk starting at row {chunk[0][0]} failed: {e}")
+            chunk_results = [_error(index, f"Chunk failed: {e}") for index, _ in chunk]
+        results.extend(chunk_results)
+
+    # Once per request rather than per chunk: a refresh recounts the whole table
+    try:
+        refresh_after_write(db, entities, month_keys)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error refreshing statistics rollups after bulk write: {e}")
+    return _summary(results)
+
+
+@router.post("/companies/bulk")
+async def bulk_upsert_companies(request: Request, db: Session = Depends(get_db)):
+    """Create or update (by name) many companies"""
+    return await _run_bulk(request, db, upsert_companies, ['companies'])
+
+
+@router.patch("/companies/bulk")
+async def bulk_update_companies(request: Request, db: Session = Depends(get_db)):
+    """Update many companies by id"""
+    return await _run_bulk(request, db, lambda db, chunk: patch_rows(db, chunk, Company, CompanyUpdate), ['companies'])
+
+
+@router.delete("/companies/bulk")
+async def bulk_delete_companies(request: Request, db: Session = Depends(get_db)):
+    """Delete many companies (and their contacts and monthly data) by id"""
+    month_keys = set()
+    return await _run_bulk(
+        request, db, lambda db, chunk: delete_rows(db, chunk, Company, month_keys),
+        ['companies', 'contacts'], month_keys
+    )
+
+
+@router.post("/contacts/bulk")
+async def bulk_upsert_contacts(request: Request, db: Session = Depends(get_db)):
+    """Create or update (by company and phone) many contacts"""
+    return await _run_bulk(request, db, upsert_contacts, ['contacts'])
+
+
+@router.patch("/contacts/bulk")
+async def bulk_update_contacts(request: Request, db: Session = Depends(get_db)):
+    """Update many contacts by id"""
+    return await _run_bulk(request, db, lambda db, chunk: patch_rows(db, chunk, Contact, ContactUpdate), ['contacts'])
+
+
+@router.delete("/contacts/bulk")
+async def bulk_delete_contacts(request: Request, db: Session = Depends(get_db)):
+    """Delete many contacts by id"""
+    return await _run_bulk(request, db, lambda db, chunk: delete_rows(db, chunk, Contact), ['contacts'])
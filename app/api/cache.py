@@ -0,0 +1,240 @@
+"""
+Response cache for read-only API routes
+
+Cached GET responses are keyed by route, normalized query parameters and
+the current data version, so any write (API handler, pipeline, publish,
+retention) makes older entries unreachable. Responses carry an ETag and
+If-None-Match requests are answered with 304.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from time import monotonic
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.concurrency import run_in_threadpool
+
+from app.models.database import get_engine
+from app.monitoring.metrics import route_label
+from app.models.versions import get_data_version
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATHS = ['/api/v1/companies', '/api/v1/contacts']
+
+# Per-request response headers that must never be replayed from an entry
+UNCACHED_HEADERS = (b'content-length', b'etag', b'vary')
+UNCACHED_HEADER_PREFIXES = (b'access-control-',)
+
+
+class LRUCacheBackend:
+    """In-process LRU cache with a per-entry TTL"""
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at < monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = (monotonic() + self.ttl_seconds, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Redis-compatible cache shared between worker processes"""
+
+    def __init__(self, url, ttl_seconds=3600, prefix='leadtool:cache:'):
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            value = self.client.get(self.prefix + key)
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache read failed: {e}")
+            return None
+        return json.loads(value) if value else None
+
+    def set(self, key, entry):
+        try:
+            self.client.setex(self.prefix + key, self.ttl_seconds, json.dumps(entry))
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache write failed: {e}")
+
+
+class ResponseCache:
+    """Cache backend plus hit/miss counters"""
+
+    def __init__(self, backend, paths=None, exclude_paths=None):
+        self.backend = backend
+        self.paths = tuple(paths or DEFAULT_CACHE_PATHS)
+        self.exclude_paths = tuple(exclude_paths or [])
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bypassed = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the cache from the settings.yaml cache section (REDIS_URL selects Redis)"""
+        ttl_seconds = config.get('ttl_seconds', 3600)
+        redis_url = os.getenv('REDIS_URL') or config.get('redis_url')
+        backend = None
+        if redis_url:
+            if redis is None:
+                logger.warning("REDIS_URL is set but the redis package is not installed; using in-process cache")
+            else:
+                backend = RedisCacheBackend(redis_url, ttl_seconds)
+        if backend is None:
+            backend = LRUCacheBackend(config.get('max_entries', 1024), ttl_seconds)
+        return cls(backend, config.get('paths'), config.get('exclude_paths'))
+
+    def is_cacheable(self, path):
+        return path.startswith(self.paths) and not path.startswith(self.exclude_paths)
+
+    def stats(self):
+        """Hit-rate counters since startup"""
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def cache_key(version, path, query_string):
+    """Cache key from data version, route and normalized query parameters"""
+    params = urlencode(sorted(parse_qsl(query_string, keep_blank_values=True)))
+    return hashlib.sha1(f"{version}|{path}?{params}".encode('utf-8')).hexdigest()
+
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+
+
+def _current_version():
+    with get_engine().connect() as conn:
+        return get_data_version(conn)
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware serving cacheable GET routes from the response cache"""
+
+    def __init__(self, app, cache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'GET' or not self.cache.is_cacheable(scope['path']):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            # Blocking database read: keep it off the event loop
+            version = await run_in_threadpool(_current_version)
+        except Exception as e:
+            logger.warning(f"Response cache bypassed, data version unavailable: {e}")
+            self.cache.bypassed += 1
+            await self.app(scope, receive, send)
+            return
+
+        key = cache_key(version, scope['path'], scope['query_string'].decode('latin-1'))
+        headers = dict((name.decode('latin-1').lower(), value.decode('latin-1')) for name, value in scope['headers'])
+        if_none_match = headers.get('if-none-match')
+
+        entry = self.cache.backend.get(key)
+        if entry is not None:
+            self.cache.hits += 1
+            # The router is skipped, so tell the metrics middleware which route this was
+            scope['leadtool.route'] = entry.get('route', 'unmatched')
+            await self._send_entry(send, entry, if_none_match, 'HIT')
+            return
+
+        self.cache.misses += 1
+        start = {}
+        body = []
+        passthrough = False
+
+        async def capture(message):
+            nonlocal passthrough
+            if message['type'] == 'http.response.start':
+                content_type = dict(message.get('headers', [])).get(b'content-type', b'')
+                if message['status'] != 200 or not content_type.startswith(b'application/json'):
+                    # Errors and streamed/non-JSON bodies go straight to the client
+                    passthrough = True
+                    await send(message)
+                    return
+                start.update(message)
+            elif passthrough:
+                await send(message)
+            elif message['type'] == 'http.response.body':
+                body.append(message.get('body', b''))
+
+        await self.app(scope, receive, capture)
+        if passthrough:
+            return
+
+        content = b''.join(body)
+        entry = {
+            'status': start['status'],
+            'headers': [
+                (name.decode('latin-1'), value.decode('latin-1'))
+                for name, value in start.get('headers', [])
+                if name.lower() not in UNCACHED_HEADERS and not name.lower().startswith(UNCACHED_HEADER_PREFIXES)
+            ],
+            'body': content.decode('utf-8', errors='replace'),
+            'etag': f'"{version}-{hashlib.sha1(content).hexdigest()[:20]}"',
+            'route': route_label(scope),
+        }
+        self.cache.backend.set(key, entry)
+        await self._send_entry(send, entry, if_none_match, 'MISS')
+
+    async def _send_entry(self, send, entry, if_none_match, cache_status):
+        """Send a cached entry, or 304 when the client already has it"""
+        extra = [(b'etag', entry['etag'].encode('latin-1')), (b'x-cache', cache_status.encode('latin-1'))]
+        if etag_matches(if_none_match, entry['etag']):
+            self.cache.not_modified += 1
+            await send({'type': 'http.response.start', 'status': 304, 'headers': extra})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        content = entry['body'].encode('utf-8')
+        headers = [(name.encode('latin-1'), value.encode('latin-1')) for name, value in entry['headers']]
+        headers += [(b'content-length', str(len(content)).encode('latin-1'))] + extra
+        await send({'type': 'http.response.start', 'status': entry['status'], 'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
@@ -0,0 +1,75 @@
+"""
+Change feed for incremental sync
+
+Mirrors poll GET /changes?since=<next_cursor> and apply the returned
+insert/update/delete events in order until has_more is false.
+"""
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.api.serialization import COMPANY_COLUMNS, CONTACT_COLUMNS, ORJSONResponse
+from app.models.changes import CHANGE_ENTITIES, read_changes
+from app.models.database import Company, Contact, get_db
+
+router = APIRouter()
+
+ENTITY_COLUMNS = {
+    'companies': (Company, COMPANY_COLUMNS),
+    'contacts': (Contact, CONTACT_COLUMNS),
+}
+
+
+def current_rows(db, changes):
+    """Current row data for inserted/updated entities, one IN query per entity"""
+    data = {}
+    for entity, (model, columns) in ENTITY_COLUMNS.items():
+        ids = {change.entity_id for change in changes if change.entity == entity and change.op != 'delete'}
+        if ids:
+            for row in db.query(*columns).filter(model.id.in_(ids)):
+                data[(entity, row.id)] = row._asdict()
+    return data
+
+
+@router.get("/changes")
+async def get_changes(
+    since: int = Query(0, ge=0, description="Cursor: next_cursor from the previous call (0 for the full history)"),
+    limit: int = Query(1000, ge=1, le=10000),
+    entity: Optional[List[str]] = Query(None, description="Restrict to companies and/or contacts"),
+    include_data: bool = Query(True, description="Attach the current row to insert/update events"),
+    db: Session = Depends(get_db)
+):
+    """Insert/update/delete events after the since cursor, oldest first"""
+    if entity:
+        unknown = set(entity) - set(CHANGE_ENTITIES)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown entity: {', '.join(sorted(unknown))}. Allowed: {', '.join(CHANGE_ENTITIES)}"
+            )
+
+    changes = read_changes(db, since, limit + 1, entity)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    data = current_rows(db, changes) if include_data else {}
+
+    events = []
+    for change in changes:
+        event = {
+            "id": change.id,
+            "entity": change.entity,
+            "entity_id": change.entity_id,
+            "op": change.op,
+            "changed_at": change.changed_at,
+        }
+        if include_data and change.op != 'delete':
+            # None when the row was deleted later on (a delete event follows)
+            event["data"] = data.get((change.entity, change.entity_id))
+        events.append(event)
+
+    return ORJSONResponse({
+        "changes": events,
+        "next_cursor": changes[-1].id if changes else since,
+        "has_more": has_more,
+    })
@@ -2,85 +2,261 @@
 Companies API endpoints for LeadTool
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, case, or_
+from typing import List, Optional, Union
 from datetime import datetime
+import math
 
-from app.models.database import get_db, Company, Contact, MonthlyData
+from app.api.pagination import COMPANY_SORT_KEYS, apply_keyset, apply_sort, keyset_page
+from app.api.serialization import (
+    COMPANY_COLUMNS, CONTACT_COLUMNS, ORJSONResponse, page_response, parse_fields,
+    project_row, projected_columns, rows_response
+)
+from app.models.changes import record_changes, record_company_deletes
+from app.models.database import get_db, Company, CompanyMetric, Contact, MonthlyData, SessionLocal
+from app.models.diff import iter_month_diff
+from app.models.geo import KM_PER_DEGREE, bounding_box, covering_cells, haversine_km
+from app.models.metrics import top_movers_statement
+from app.models.partitions import MONTH_KEY_RE
+from app.models.search import apply_fulltext_search, apply_rating_filters, apply_text_filter
+from app.models.rollups import apply_rollup_deltas, read_rollup, rollup_snapshot, rollup_total
+from app.models.snapshots import filter_active_month
+from app.models.versions import bump_data_version
 from app.models.schemas import (
     Company as CompanySchema, CompanyCreate, CompanyUpdate,
-    CompanyWithContacts, CompanyFilter
+    CompanyWithContacts, CompanyFilter, CompanyPage,
+    CompanyMetric as CompanyMetricSchema, CompanyTrend, CompanyNearby, CompanyBatchGetRequest
 )
 
 router = APIRouter()
 
 @router.get("/companies/stats")
 async def get_company_stats(db: Session = Depends(get_db)):
-    """Get company statistics"""
-    total_companies = db.query(Company).count()
-    
-    # Get companies by industry
-    industry_stats = db.query(
-        Company.industry, 
-        db.func.count(Company.id).label('count')
-    ).group_by(Company.industry).all()
-    
-    # Get companies by location
-    location_stats = db.query(
-        Company.location, 
-        db.func.count(Company.id).label('count')
-    ).group_by(Company.location).all()
+    """Get company statistics (served from the precomputed rollup)"""
+    dimensions, refreshed_at = read_rollup(db, 'companies')
     
     return {
-        "total_companies": total_companies,
-        "by_industry": [{"industry": i[0], "count": i[1]} for i in industry_stats if i[0]],
-        "by_location": [{"location": i[0], "count": i[1]} for i in location_stats if i[0]]
+        "total_companies": rollup_total(dimensions),
+        "by_industry": [{"industry": v, "count": c} for v, c in dimensions.get('industry', [])],
+        "by_location": [{"location": v, "count": c} for v, c in dimensions.get('location', [])],
+        "by_category": [{"category": v, "count": c} for v, c in dimensions.get('category', [])],
+        "by_source": [{"source": v, "count": c} for v, c in dimensions.get('source', [])],
+        "by_month": [{"month_key": v, "count": c} for v, c in sorted(dimensions.get('month', []))],
+        "refreshed_at": refreshed_at
     }
 
-@router.get("/companies", response_model=List[CompanySchema])
+@router.get("/companies", response_model=Union[List[CompanySchema], CompanyPage])
 async def get_companies(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    sort: str = Query("id", description="Sort key: id, name, rating, review_count or created_at (prefix with - for descending)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; pass an empty value for the first page. Switches the response to a paginated envelope"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included)"),
     name: Optional[str] = None,
     domain: Optional[str] = None,
     industry: Optional[str] = None,
     location: Optional[str] = None,
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    max_rating: Optional[float] = Query(None, ge=0, le=5),
+    min_reviews: Optional[int] = Query(None, ge=0),
     month_key: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Get companies with optional filtering"""
-    query = db.query(Company)
+    # Plain column rows (only the requested fields), serialized straight to JSON
+    names = parse_fields(fields, CompanySchema)
+    query = db.query(*projected_columns(Company, names, COMPANY_COLUMNS, extra=[sort.lstrip('-')]))
     
-    # Apply filters
+    # Apply filters (exact, prefix or substring depending on the value)
+    dialect = db.get_bind().dialect.name
     if name:
-        query = query.filter(Company.name.ilike(f"%{name}%"))
+        query = apply_text_filter(query, Company, 'name', name, dialect)
     if domain:
-        query = query.filter(Company.domain.ilike(f"%{domain}%"))
+        query = apply_text_filter(query, Company, 'domain', domain, dialect)
     if industry:
-        query = query.filter(Company.industry.ilike(f"%{industry}%"))
+        query = apply_text_filter(query, Company, 'industry', industry, dialect)
     if location:
-        query = query.filter(Company.location.ilike(f"%{location}%"))
+        query = apply_text_filter(query, Company, 'location', location, dialect)
+    query = apply_rating_filters(query, Company, min_rating, max_rating, min_reviews)
     
     # Filter by month if specified
     if month_key:
-        query = query.join(MonthlyData).filter(
-            MonthlyData.month_key == month_key,
-            MonthlyData.is_active == True
-        )
+        query = filter_active_month(query, month_key)
+    
+    # Keyset pagination: stable under concurrent inserts, constant cost per page
+    if cursor is not None:
+        query = apply_keyset(query, Company, sort, COMPANY_SORT_KEYS, cursor)
+        return page_response(keyset_page(query.limit(limit + 1).all(), sort, limit), names)
     
     # Apply pagination
+    companies = apply_sort(query, Company, sort, COMPANY_SORT_KEYS).offset(skip).limit(limit).all()
+    return rows_response(companies, names)
+
+@router.get("/companies/search", response_model=Union[List[CompanySchema], CompanyPage])
+async def search_companies(
+    q: str = Query(..., description="Search query"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    sort: str = Query("id", description="Sort key: id, name, rating, review_count or created_at (prefix with - for descending)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; pass an empty value for the first page. Switches the response to a paginated envelope"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included)"),
+    db: Session = Depends(get_db)
+):
+    """Search companies by name, domain, description, industry or location (ranked)"""
+    dialect = db.get_bind().dialect.name
+    names = parse_fields(fields, CompanySchema)
+    columns = projected_columns(Company, names, COMPANY_COLUMNS, extra=[sort.lstrip('-')])
+    
+    # With a cursor, results follow the sort key instead of relevance
+    if cursor is not None:
+        query = apply_fulltext_search(db.query(*columns), Company, q, dialect, ranked=False)
+        query = apply_keyset(query, Company, sort, COMPANY_SORT_KEYS, cursor)
+        return page_response(keyset_page(query.limit(limit + 1).all(), sort, limit), names)
+    
+    query = apply_fulltext_search(db.query(*columns), Company, q, dialect)
     companies = query.offset(skip).limit(limit).all()
-    return companies
+    return rows_response(companies, names)
+
+@router.get("/companies/nearby", response_model=List[CompanyNearby])
+async def get_nearby_companies(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5.0, gt=0, le=200),
+    category: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Get companies within radius_km of a point, nearest first"""
+    # Candidates come from geohash prefix ranges (index scans) inside the bounding box;
+    # "{" sorts right after "z", the last geohash character
+    cells = covering_cells(lat, lon, radius_km)
+    min_lat, max_lat, lon_ranges = bounding_box(lat, lon, radius_km)
+    query = db.query(Company).filter(
+        or_(*[and_(Company.geohash >= cell, Company.geohash < cell + '{') for cell in cells]),
+        Company.latitude.between(min_lat, max_lat),
+        or_(*[Company.longitude.between(min_lon, max_lon) for min_lon, max_lon in lon_ranges])
+    )
+    if category:
+        query = apply_text_filter(query, Company, 'category', category, db.get_bind().dialect.name)
+    
+    # Equirectangular distance orders correctly at these scales using plain arithmetic;
+    # longitude differences are wrapped so points across the antimeridian stay close
+    dlon = Company.longitude - lon
+    dlon = case((dlon > 180, dlon - 360), (dlon < -180, dlon + 360), else_=dlon)
+    dx = dlon * math.cos(math.radians(lat))
+    dy = Company.latitude - lat
+    distance_sq = dx * dx + dy * dy
+    max_sq = (radius_km * 1.01 / KM_PER_DEGREE) ** 2
+    companies = query.filter(distance_sq <= max_sq).order_by(distance_sq).limit(limit).all()
+    
+    results = []
+    for company in companies:
+        distance = haversine_km(lat, lon, company.latitude, company.longitude)
+        if distance <= radius_km:
+            results.append(CompanyNearby(
+                **CompanySchema.model_validate(company).model_dump(),
+                distance_km=round(distance, 3)
+            ))
+    return results
+
+@router.get("/companies/diff")
+async def get_companies_diff(
+    from_month: str = Query(..., alias="from", description="Earlier month (YYYY-MM)"),
+    to_month: str = Query(..., alias="to", description="Later month (YYYY-MM)")
+):
+    """Stream added, removed and changed companies between two months as NDJSON"""
+    for month_key in (from_month, to_month):
+        if not MONTH_KEY_RE.match(month_key):
+            raise HTTPException(status_code=400, detail=f"Invalid month '{month_key}', expected YYYY-MM")
+    
+    def generate():
+        # The stream outlives the request dependencies, so it owns its session
+        db = SessionLocal()
+        try:
+            yield from iter_month_diff(db, from_month, to_month)
+        finally:
+            db.close()
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename=companies_diff_{from_month}_{to_month}.ndjson"}
+    )
+
+@router.get("/companies/trends", response_model=List[CompanyTrend])
+async def get_company_trends(
+    from_month: str = Query(..., alias="from", description="Earlier month (YYYY-MM)"),
+    to_month: str = Query(..., alias="to", description="Later month (YYYY-MM)"),
+    metric: str = Query("review_count", pattern="^(review_count|rating)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="desc for top gainers, asc for top decliners"),
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Get the companies whose metric changed most between two months"""
+    for month_key in (from_month, to_month):
+        if not MONTH_KEY_RE.match(month_key):
+            raise HTTPException(status_code=400, detail=f"Invalid month '{month_key}', expected YYYY-MM")
+    
+    statement = top_movers_statement(from_month, to_month, metric, limit, descending=(order == "desc"))
+    return [dict(row) for row in db.execute(statement).mappings()]
+
+@router.post("/companies/batch-get")
+async def batch_get_companies(request: CompanyBatchGetRequest, db: Session = Depends(get_db)):
+    """Get many companies by id (one IN query, plus one for contacts), in the order requested"""
+    names = parse_fields(request.fields, CompanySchema)
+    ids = list(dict.fromkeys(request.ids))
+    rows = db.query(*projected_columns(Company, names, COMPANY_COLUMNS)).filter(Company.id.in_(ids)).all()
+    found = {row.id: project_row(row, names) for row in rows}
+    
+    # Contacts for all companies in a single IN query (what selectinload would issue)
+    if request.include_contacts and found:
+        for company in found.values():
+            company['contacts'] = []
+        contacts = db.query(*CONTACT_COLUMNS).filter(Contact.company_id.in_(list(found))).order_by(Contact.id)
+        for contact in contacts:
+            found[contact.company_id]['contacts'].append(contact._asdict())
+    
+    return ORJSONResponse({
+        "items": [found[company_id] for company_id in ids if company_id in found],
+        "missing": [company_id for company_id in ids if company_id not in found],
+    })
 
 @router.get("/companies/{company_id}", response_model=CompanyWithContacts)
-async def get_company(company_id: int, db: Session = Depends(get_db)):
+async def get_company(
+    company_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included; add contacts for the contact list)"),
+    db: Session = Depends(get_db)
+):
     """Get a specific company with its contacts"""
-    company = db.query(Company).filter(Company.id == company_id).first()
+    names = parse_fields(fields, CompanyWithContacts)
+    if names is not None:
+        row = db.query(*projected_columns(Company, names, COMPANY_COLUMNS)).filter(Company.id == company_id).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Company not found")
+        company = row._asdict()
+        if 'contacts' in names:
+            contacts = db.query(*CONTACT_COLUMNS).filter(Contact.company_id == company_id).order_by(Contact.id).all()
+            company['contacts'] = [contact._asdict() for contact in contacts]
+        return ORJSONResponse(company)
+    
+    # Contacts come in the same query instead of a lazy load during serialization
+    company = db.query(Company).options(joinedload(Company.contacts)).filter(Company.id == company_id).first()
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     return company
 
+@router.get("/companies/{company_id}/history", response_model=List[CompanyMetricSchema])
+async def get_company_history(company_id: int, db: Session = Depends(get_db)):
+    """Get a company's monthly metrics in month order"""
+    if not db.query(Company.id).filter(Company.id == company_id).first():
+        raise HTTPException(status_code=404, detail="Company not found")
+    
+    return db.query(CompanyMetric).filter(
+        CompanyMetric.company_id == company_id
+    ).order_by(CompanyMetric.month_key).all()
+
 @router.post("/companies", response_model=CompanySchema)
 async def create_company(company: CompanyCreate, db: Session = Depends(get_db)):
     """Create a new company"""
@@ -91,6 +267,10 @@ async def create_company(company: CompanyCreate, db: Session = Depends(get_db)):
     
     db_company = Company(**company.dict())
     db.add(db_company)
+    bump_data_version(db)
+    db.flush()
+    record_changes(db, 'companies', 'insert', [db_company.id])
+    apply_rollup_deltas(db, 'companies', added=[rollup_snapshot('companies', db_company)])
     db.commit()
     db.refresh(db_company)
     return db_company
@@ -107,10 +287,14 @@ async def update_company(
         raise HTTPException(status_code=404, detail="Company not found")
     
     # Update only provided fields
+    before = rollup_snapshot('companies', db_company)
     update_data = company.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_company, field, value)
     
+    bump_data_version(db)
+    record_changes(db, 'companies', 'update', [company_id])
+    apply_rollup_deltas(db, 'companies', removed=[before], added=[rollup_snapshot('companies', db_company)])
     db.commit()
     db.refresh(db_company)
     return db_company
@@ -122,27 +306,13 @@ async def delete_company(company_id: int, db: Session = Depends(get_db)):
     if not db_company:
         raise HTTPException(status_code=404, detail="Company not found")
     
+    bump_data_version(db)
+    record_company_deletes(db, [company_id])
+    month_keys = {month_key for (month_key,) in db.query(MonthlyData.month_key).filter(
+        MonthlyData.company_id == company_id, MonthlyData.data_type == 'company'
+    ).distinct()}
+    apply_rollup_deltas(db, 'companies', removed=[rollup_snapshot('companies', db_company)], removed_months=month_keys)
+    apply_rollup_deltas(db, 'contacts', removed=[rollup_snapshot('contacts', contact) for contact in db_company.contacts])
     db.delete(db_company)
     db.commit()
-    return {"message": "Company deleted successfully"}
-
-@router.get("/companies/search", response_model=List[CompanySchema])
-async def search_companies(
-    q: str = Query(..., description="Search query"),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
-):
-    """Search companies by name, domain, or description"""
-    query = db.query(Company).filter(
-        or_(
-            Company.name.ilike(f"%{q}%"),
-            Company.domain.ilike(f"%{q}%"),
-            Company.description.ilike(f"%{q}%"),
-            Company.industry.ilike(f"%{q}%"),
-            Company.location.ilike(f"%{q}%")
-        )
-    )
-    
-    companies = query.offset(skip).limit(limit).all()
-    return companies
+    return {"message": "Company deleted successfully"}
\ No newline at end of file
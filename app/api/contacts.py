@@ -4,20 +4,32 @@ Contacts API endpoints for LeadTool
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
-from typing import List, Optional
+from typing import List, Optional, Union
 
+from app.api.pagination import CONTACT_SORT_KEYS, apply_keyset, apply_sort, keyset_page
+from app.api.serialization import (
+    CONTACT_COLUMNS, ORJSONResponse, page_response, parse_fields, project_row, projected_columns,
+    rows_response
+)
+from app.models.changes import record_changes
 from app.models.database import get_db, Company, Contact, MonthlyData
+from app.models.search import apply_fulltext_search, apply_text_filter
+from app.models.rollups import apply_rollup_deltas, read_rollup, rollup_snapshot, rollup_total
+from app.models.versions import bump_data_version
 from app.models.schemas import (
     Contact as ContactSchema, ContactCreate, ContactUpdate,
-    ContactFilter
+    ContactFilter, ContactPage, BatchGetRequest
 )
 
 router = APIRouter()
 
-@router.get("/contacts", response_model=List[ContactSchema])
+@router.get("/contacts", response_model=Union[List[ContactSchema], ContactPage])
 async def get_contacts(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    sort: str = Query("id", description="Sort key: id, last_name, first_name or created_at (prefix with - for descending)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; pass an empty value for the first page. Switches the response to a paginated envelope"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included)"),
     company_id: Optional[int] = None,
     title: Optional[str] = None,
     department: Optional[str] = None,
@@ -25,25 +37,95 @@ async def get_contacts(
     db: Session = Depends(get_db)
 ):
     """Get contacts with optional filtering"""
-    query = db.query(Contact)
+    # Plain column rows (only the requested fields), serialized straight to JSON
+    names = parse_fields(fields, ContactSchema)
+    query = db.query(*projected_columns(Contact, names, CONTACT_COLUMNS, extra=[sort.lstrip('-')]))
     
-    # Apply filters
+    # Apply filters (exact, prefix or substring depending on the value)
+    dialect = db.get_bind().dialect.name
     if company_id:
         query = query.filter(Contact.company_id == company_id)
     if title:
-        query = query.filter(Contact.title.ilike(f"%{title}%"))
+        query = apply_text_filter(query, Contact, 'title', title, dialect)
     if department:
-        query = query.filter(Contact.department.ilike(f"%{department}%"))
+        query = apply_text_filter(query, Contact, 'department', department, dialect)
     if is_primary is not None:
         query = query.filter(Contact.is_primary == is_primary)
     
+    # Keyset pagination: stable under concurrent inserts, constant cost per page
+    if cursor is not None:
+        query = apply_keyset(query, Contact, sort, CONTACT_SORT_KEYS, cursor)
+        return page_response(keyset_page(query.limit(limit + 1).all(), sort, limit), names)
+    
     # Apply pagination
+    contacts = apply_sort(query, Contact, sort, CONTACT_SORT_KEYS).offset(skip).limit(limit).all()
+    return rows_response(contacts, names)
+
+@router.get("/contacts/search", response_model=Union[List[ContactSchema], ContactPage])
+async def search_contacts(
+    q: str = Query(..., description="Search query"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    sort: str = Query("id", description="Sort key: id, last_name, first_name or created_at (prefix with - for descending)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; pass an empty value for the first page. Switches the response to a paginated envelope"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included)"),
+    db: Session = Depends(get_db)
+):
+    """Search contacts by name, title or department (ranked)"""
+    dialect = db.get_bind().dialect.name
+    names = parse_fields(fields, ContactSchema)
+    columns = projected_columns(Contact, names, CONTACT_COLUMNS, extra=[sort.lstrip('-')])
+    
+    # With a cursor, results follow the sort key instead of relevance
+    if cursor is not None:
+        query = apply_fulltext_search(db.query(*columns), Contact, q, dialect, ranked=False)
+        query = apply_keyset(query, Contact, sort, CONTACT_SORT_KEYS, cursor)
+        return page_response(keyset_page(query.limit(limit + 1).all(), sort, limit), names)
+    
+    query = apply_fulltext_search(db.query(*columns), Contact, q, dialect)
     contacts = query.offset(skip).limit(limit).all()
-    return contacts
+    return rows_response(contacts, names)
+
+@router.get("/contacts/stats")
+async def get_contact_stats(db: Session = Depends(get_db)):
+    """Get contact statistics (served from the precomputed rollup)"""
+    dimensions, refreshed_at = read_rollup(db, 'contacts')
+    
+    return {
+        "total_contacts": rollup_total(dimensions),
+        "contacts_with_phones": rollup_total(dimensions, 'with_phone'),
+        "by_title": [{"title": v, "count": c} for v, c in dimensions.get('title', [])],
+        "by_department": [{"department": v, "count": c} for v, c in dimensions.get('department', [])],
+        "refreshed_at": refreshed_at
+    }
+
+@router.post("/contacts/batch-get")
+async def batch_get_contacts(request: BatchGetRequest, db: Session = Depends(get_db)):
+    """Get many contacts by id with one IN query, in the order requested"""
+    names = parse_fields(request.fields, ContactSchema)
+    ids = list(dict.fromkeys(request.ids))
+    rows = db.query(*projected_columns(Contact, names, CONTACT_COLUMNS)).filter(Contact.id.in_(ids)).all()
+    found = {row.id: project_row(row, names) for row in rows}
+    
+    return ORJSONResponse({
+        "items": [found[contact_id] for contact_id in ids if contact_id in found],
+        "missing": [contact_id for contact_id in ids if contact_id not in found],
+    })
 
 @router.get("/contacts/{contact_id}", response_model=ContactSchema)
-async def get_contact(contact_id: int, db: Session = Depends(get_db)):
+async def get_contact(
+    contact_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included)"),
+    db: Session = Depends(get_db)
+):
     """Get a specific contact"""
+    names = parse_fields(fields, ContactSchema)
+    if names is not None:
+        row = db.query(*projected_columns(Contact, names, CONTACT_COLUMNS)).filter(Contact.id == contact_id).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Contact not found")
+        return ORJSONResponse(row._asdict())
+    
     contact = db.query(Contact).filter(Contact.id == contact_id).first()
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
@@ -60,6 +142,10 @@ async def create_contact(contact: ContactCreate, db: Session = Depends(get_db)):
     
     db_contact = Contact(**contact.dict())
     db.add(db_contact)
+    bump_data_version(db)
+    db.flush()
+    record_changes(db, 'contacts', 'insert', [db_contact.id])
+    apply_rollup_deltas(db, 'contacts', added=[rollup_snapshot('contacts', db_contact)])
     db.commit()
     db.refresh(db_contact)
     return db_contact
@@ -76,10 +162,14 @@ async def update_contact(
         raise HTTPException(status_code=404, detail="Contact not found")
     
     # Update only provided fields
+    before = rollup_snapshot('contacts', db_contact)
     update_data = contact.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_contact, field, value)
     
+    bump_data_version(db)
+    record_changes(db, 'contacts', 'update', [contact_id])
+    apply_rollup_deltas(db, 'contacts', removed=[before], added=[rollup_snapshot('contacts', db_contact)])
     db.commit()
     db.refresh(db_contact)
     return db_contact
@@ -91,53 +181,9 @@ async def delete_contact(contact_id: int, db: Session = Depends(get_db)):
     if not db_contact:
         raise HTTPException(status_code=404, detail="Contact not found")
     
+    bump_data_version(db)
+    record_changes(db, 'contacts', 'delete', [contact_id])
+    apply_rollup_deltas(db, 'contacts', removed=[rollup_snapshot('contacts', db_contact)])
     db.delete(db_contact)
     db.commit()
-    return {"message": "Contact deleted successfully"}
-
-@router.get("/contacts/search", response_model=List[ContactSchema])
-async def search_contacts(
-    q: str = Query(..., description="Search query"),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
-):
-    """Search contacts by name or title"""
-    query = db.query(Contact).filter(
-        or_(
-            Contact.first_name.ilike(f"%{q}%"),
-            Contact.last_name.ilike(f"%{q}%"),
-            Contact.title.ilike(f"%{q}%"),
-            Contact.department.ilike(f"%{q}%")
-        )
-    )
-    
-    contacts = query.offset(skip).limit(limit).all()
-    return contacts
-
-@router.get("/contacts/stats")
-async def get_contact_stats(db: Session = Depends(get_db)):
-    """Get contact statistics"""
-    total_contacts = db.query(Contact).count()
-    
-    # Get contacts by title
-    title_stats = db.query(
-        Contact.title, 
-        db.func.count(Contact.id).label('count')
-    ).group_by(Contact.title).all()
-    
-    # Get contacts by department
-    department_stats = db.query(
-        Contact.department, 
-        db.func.count(Contact.id).label('count')
-    ).group_by(Contact.department).all()
-    
-    # Get contacts with phones
-    contacts_with_phones = db.query(Contact).filter(Contact.phone.isnot(None)).count()
-    
-    return {
-        "total_contacts": total_contacts,
-        "contacts_with_phones": contacts_with_phones,
-        "by_title": [{"title": i[0], "count": i[1]} for i in title_stats if i[0]],
-        "by_department": [{"department": i[0], "count": i[1]} for i in department_stats if i[0]]
-    }
+    return {"message": "Contact deleted successfully"}
\ No newline at end of file
@@ -3,7 +3,7 @@ Export API endpoints for LeadTool
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import and_, or_
 from typing import List, Optional
 import csv
@@ -12,10 +12,51 @@ import pandas as pd
 from datetime import datetime
 
 from app.models.database import get_db, Company, Contact, MonthlyData
+from app.api.pagination import COMPANY_SORT_KEYS, apply_sort
+from app.models.search import apply_rating_filters, apply_text_filter
+from app.models.snapshots import filter_active_month
 from app.models.schemas import ExportRequest
 
 router = APIRouter()
 
+# (field, header) pairs written by the company and contact exports
+COMPANY_EXPORT_COLUMNS = [
+    ('id', 'ID'), ('name', 'Name'), ('domain', 'Domain'), ('description', 'Description'),
+    ('website', 'Website'), ('industry', 'Industry'), ('size', 'Size'), ('location', 'Location'),
+    ('rating', 'Rating'), ('review_count', 'Review Count'),
+    ('created_at', 'Created At'), ('updated_at', 'Updated At'),
+]
+CONTACT_EXPORT_COLUMNS = [
+    ('id', 'ID'), ('company_id', 'Company ID'), ('phone', 'Phone'), ('first_name', 'First Name'),
+    ('last_name', 'Last Name'), ('title', 'Title'), ('department', 'Department'),
+    ('address', 'Address'), ('linkedin', 'LinkedIn'), ('is_primary', 'Is Primary'),
+    ('created_at', 'Created At'),
+]
+
+
+def select_export_columns(spec, fields):
+    """Narrow an export column spec to a comma-separated fields= value"""
+    if not fields:
+        return spec
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    allowed = [name for name, _ in spec]
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}"
+        )
+    return [(name, header) for name, header in spec if name in requested]
+
+
+def export_value(value):
+    """Format a value for CSV/Excel output"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
 @router.get("/export/companies")
 async def export_companies(
     format: str = Query("csv", regex="^(csv|excel)$"),
@@ -23,35 +64,41 @@ async def export_companies(
     domain: Optional[str] = None,
     industry: Optional[str] = None,
     location: Optional[str] = None,
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    max_rating: Optional[float] = Query(None, ge=0, le=5),
+    min_reviews: Optional[int] = Query(None, ge=0),
+    sort: str = Query("id", description="Sort key: id, name, rating, review_count or created_at (prefix with - for descending)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to export (default: all)"),
     month_key: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Export companies to CSV or Excel"""
-    query = db.query(Company)
+    # Only the exported columns are read from the database
+    columns = select_export_columns(COMPANY_EXPORT_COLUMNS, fields)
+    query = db.query(*[Company.__table__.c[name] for name, _ in columns])
     
-    # Apply filters
+    # Apply filters (exact, prefix or substring depending on the value)
+    dialect = db.get_bind().dialect.name
     if name:
-        query = query.filter(Company.name.ilike(f"%{name}%"))
+        query = apply_text_filter(query, Company, 'name', name, dialect)
     if domain:
-        query = query.filter(Company.domain.ilike(f"%{domain}%"))
+        query = apply_text_filter(query, Company, 'domain', domain, dialect)
     if industry:
-        query = query.filter(Company.industry.ilike(f"%{industry}%"))
+        query = apply_text_filter(query, Company, 'industry', industry, dialect)
     if location:
-        query = query.filter(Company.location.ilike(f"%{location}%"))
+        query = apply_text_filter(query, Company, 'location', location, dialect)
+    query = apply_rating_filters(query, Company, min_rating, max_rating, min_reviews)
     
     # Filter by month if specified
     if month_key:
-        query = query.join(MonthlyData).filter(
-            MonthlyData.month_key == month_key,
-            MonthlyData.is_active == True
-        )
+        query = filter_active_month(query, month_key)
     
-    companies = query.all()
+    companies = apply_sort(query, Company, sort, COMPANY_SORT_KEYS).all()
     
     if format == "csv":
-        return export_companies_csv(companies)
+        return export_companies_csv(companies, columns)
     else:
-        return export_companies_excel(companies)
+        return export_companies_excel(companies, columns)
 
 @router.get("/export/contacts")
 async def export_contacts(
@@ -60,76 +107,68 @@ async def export_contacts(
     title: Optional[str] = None,
     department: Optional[str] = None,
     is_primary: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to export (default: all)"),
     db: Session = Depends(get_db)
 ):
     """Export contacts to CSV or Excel"""
-    query = db.query(Contact)
+    # Only the exported columns are read from the database
+    columns = select_export_columns(CONTACT_EXPORT_COLUMNS, fields)
+    query = db.query(*[Contact.__table__.c[name] for name, _ in columns])
     
-    # Apply filters
+    # Apply filters (exact, prefix or substring depending on the value)
+    dialect = db.get_bind().dialect.name
     if company_id:
         query = query.filter(Contact.company_id == company_id)
     if title:
-        query = query.filter(Contact.title.ilike(f"%{title}%"))
+        query = apply_text_filter(query, Contact, 'title', title, dialect)
     if department:
-        query = query.filter(Contact.department.ilike(f"%{department}%"))
+        query = apply_text_filter(query, Contact, 'department', department, dialect)
     if is_primary is not None:
         query = query.filter(Contact.is_primary == is_primary)
     
     contacts = query.all()
     
     if format == "csv":
-        return export_contacts_csv(contacts)
+        return export_contacts_csv(contacts, columns)
     else:
-        return export_contacts_excel(contacts)
+        return export_contacts_excel(contacts, columns)
 
 @router.get("/export/combined")
 async def export_combined(
     format: str = Query("csv", regex="^(csv|excel)$"),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    max_rating: Optional[float] = Query(None, ge=0, le=5),
+    min_reviews: Optional[int] = Query(None, ge=0),
+    sort: str = Query("id", description="Sort key: id, name, rating, review_count or created_at (prefix with - for descending)"),
     month_key: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Export combined company and contact data"""
-    # Get companies with their contacts
-    query = db.query(Company)
+    # Get companies with their contacts (one extra IN query per 500 companies, not one per company)
+    query = db.query(Company).options(selectinload(Company.contacts))
+    query = apply_rating_filters(query, Company, min_rating, max_rating, min_reviews)
     
     if month_key:
-        query = query.join(MonthlyData).filter(
-            MonthlyData.month_key == month_key,
-            MonthlyData.is_active == True
-        )
+        query = filter_active_month(query, month_key)
     
-    companies = query.all()
+    companies = apply_sort(query, Company, sort, COMPANY_SORT_KEYS).all()
     
     if format == "csv":
         return export_combined_csv(companies)
     else:
         return export_combined_excel(companies)
 
-def export_companies_csv(companies):
+def export_companies_csv(companies, columns=COMPANY_EXPORT_COLUMNS):
     """Export companies to CSV"""
     output = io.StringIO()
     writer = csv.writer(output)
     
     # Write header
-    writer.writerow([
-        'ID', 'Name', 'Domain', 'Description', 'Website', 
-        'Industry', 'Size', 'Location', 'Created At', 'Updated At'
-    ])
+    writer.writerow([header for _, header in columns])
     
     # Write data
     for company in companies:
-        writer.writerow([
-            company.id,
-            company.name,
-            company.domain,
-            company.description,
-            company.website,
-            company.industry,
-            company.size,
-            company.location,
-            company.created_at.isoformat() if company.created_at else '',
-            company.updated_at.isoformat() if company.updated_at else ''
-        ])
+        writer.writerow([export_value(getattr(company, name)) for name, _ in columns])
     
     output.seek(0)
     return StreamingResponse(
@@ -138,32 +177,17 @@ def export_companies_csv(companies):
         headers={'Content-Disposition': 'attachment; filename=companies.csv'}
     )
 
-def export_contacts_csv(contacts):
+def export_contacts_csv(contacts, columns=CONTACT_EXPORT_COLUMNS):
     """Export contacts to CSV"""
     output = io.StringIO()
     writer = csv.writer(output)
     
     # Write header
-    writer.writerow([
-        'ID', 'Company ID', 'Phone', 'First Name', 'Last Name',
-        'Title', 'Department', 'Address', 'LinkedIn', 'Is Primary', 'Created At'
-    ])
+    writer.writerow([header for _, header in columns])
     
     # Write data
     for contact in contacts:
-        writer.writerow([
-            contact.id,
-            contact.company_id,
-            contact.phone,
-            contact.first_name,
-            contact.last_name,
-            contact.title,
-            contact.department,
-            contact.address,
-            contact.linkedin,
-            contact.is_primary,
-            contact.created_at.isoformat() if contact.created_at else ''
-        ])
+        writer.writerow([export_value(getattr(contact, name)) for name, _ in columns])
     
     output.seek(0)
     return StreamingResponse(
@@ -219,20 +243,12 @@ def export_combined_csv(companies):
         headers={'Content-Disposition': 'attachment; filename=combined_data.csv'}
     )
 
-def export_companies_excel(companies):
+def export_companies_excel(companies, columns=COMPANY_EXPORT_COLUMNS):
     """Export companies to Excel"""
-    df = pd.DataFrame([{
-        'ID': company.id,
-        'Name': company.name,
-        'Domain': company.domain,
-        'Description': company.description,
-        'Website': company.website,
-        'Industry': company.industry,
-        'Size': company.size,
-        'Location': company.location,
-        'Created At': company.created_at.isoformat() if company.created_at else '',
-        'Updated At': company.updated_at.isoformat() if company.updated_at else ''
-    } for company in companies])
+    df = pd.DataFrame(
+        [[export_value(getattr(company, name)) for name, _ in columns] for company in companies],
+        columns=[header for _, header in columns]
+    )
     
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
@@ -245,21 +261,12 @@ def export_companies_excel(companies):
         headers={'Content-Disposition': 'attachment; filename=companies.xlsx'}
     )
 
-def export_contacts_excel(contacts):
+def export_contacts_excel(contacts, columns=CONTACT_EXPORT_COLUMNS):
     """Export contacts to Excel"""
-    df = pd.DataFrame([{
-        'ID': contact.id,
-        'Company ID': contact.company_id,
-        'Phone': contact.phone,
-        'First Name': contact.first_name,
-        'Last Name': contact.last_name,
-        'Title': contact.title,
-        'Department': contact.department,
-        'Address': contact.address,
-        'LinkedIn': contact.linkedin,
-        'Is Primary': contact.is_primary,
-        'Created At': contact.created_at.isoformat() if contact.created_at else ''
-    } for contact in contacts])
+    df = pd.DataFrame(
+        [[export_value(getattr(contact, name)) for name, _ in columns] for contact in contacts],
+        columns=[header for _, header in columns]
+    )
     
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
@@ -0,0 +1,107 @@
+"""
+Keyset (cursor) pagination for LeadTool list endpoints
+"""
+import base64
+import json
+from collections.abc import Mapping
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, String, and_, or_, type_coerce
+
+# Sort keys (model attribute names) accepted by each list endpoint
+COMPANY_SORT_KEYS = ['id', 'name', 'rating', 'review_count', 'created_at']
+CONTACT_SORT_KEYS = ['id', 'last_name', 'first_name', 'created_at']
+
+
+def parse_sort(sort, allowed):
+    """Split "-rating" into ("rating", True) and validate the key"""
+    descending = sort.startswith('-')
+    key = sort.lstrip('-')
+    if key not in allowed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort '{sort}'. Allowed: {', '.join(allowed)} (prefix with - for descending)"
+        )
+    return key, descending
+
+
+def encode_cursor(sort, value, row_id):
+    """Encode the position after a row as an opaque cursor"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort, value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Decode a cursor produced by encode_cursor for the same sort order"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort:
+        raise HTTPException(status_code=400, detail="Cursor was issued for a different sort order")
+    return value, row_id
+
+
+def apply_sort(query, model, sort, allowed):
+    """Order a query by (sort key, id) with NULLs last
+
+    The id tiebreak follows the sort direction so a (column, id) index
+    can be scanned in either direction.
+    """
+    key, descending = parse_sort(sort, allowed)
+    column = getattr(model, key)
+    tiebreak = model.id.desc() if descending else model.id.asc()
+    if key == 'id':
+        return query.order_by(tiebreak)
+    order = column.desc() if descending else column.asc()
+    return query.order_by(order.nulls_last(), tiebreak)
+
+
+def apply_keyset(query, model, sort, allowed, cursor):
+    """Order by (sort key, id) and continue after the cursor position (if any)"""
+    key, descending = parse_sort(sort, allowed)
+    column = getattr(model, key)
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        after_id = model.id < last_id if descending else model.id > last_id
+        if key == 'id':
+            query = query.filter(after_id)
+        elif value is None:
+            # Already inside the trailing NULL block
+            query = query.filter(column.is_(None), after_id)
+        else:
+            compared = column
+            if isinstance(column.type, DateTime):
+                # Compare as text in the DB's own format: SQLite stores
+                # server-default timestamps as "YYYY-MM-DD HH:MM:SS"
+                compared = type_coerce(column, String)
+                value = str(datetime.fromisoformat(value))
+            after = compared < value if descending else compared > value
+            query = query.filter(or_(
+                after,
+                and_(compared == value, after_id),
+                column.is_(None)
+            ))
+
+    return apply_sort(query, model, sort, allowed)
+
+
+def _row_value(row, key):
+    """Read a field from an ORM object or a mapping row"""
+    return row[key] if isinstance(row, Mapping) else getattr(row, key)
+
+
+def keyset_page(rows, sort, limit):
+    """Build the response envelope from limit + 1 fetched rows"""
+    key = sort.lstrip('-')
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(sort, _row_value(last, key), _row_value(last, 'id'))
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,80 @@
+"""
+Fast JSON path for high-volume read-only routes
+
+Rows are fetched as plain column tuples (no ORM entities or identity map)
+and encoded by orjson directly. The database output is trusted, so the
+per-row Pydantic validation of the response model is skipped; the column
+list is derived from the response schema to keep the payload identical.
+"""
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from app.models.database import Company, Contact
+from app.models.schemas import Company as CompanySchema, Contact as ContactSchema
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response encoded with orjson (native datetime support)"""
+    media_type = "application/json"
+
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def schema_columns(model, schema):
+    """Table columns for the fields of a response schema, in schema order"""
+    return [model.__table__.c[name] for name in schema.model_fields]
+
+
+COMPANY_COLUMNS = schema_columns(Company, CompanySchema)
+CONTACT_COLUMNS = schema_columns(Contact, ContactSchema)
+
+
+def parse_fields(fields, schema, always=('id',)):
+    """Parse a comma-separated fields= value against a response schema
+
+    Returns None when no projection was requested, otherwise the field
+    names in schema order (always including id).
+    """
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    allowed = list(schema.model_fields)
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}"
+        )
+    requested.update(always)
+    return [name for name in allowed if name in requested]
+
+
+def projected_columns(model, names, default, extra=()):
+    """Columns to SELECT for a projection, plus extra names used internally (e.g. the sort key)"""
+    if names is None:
+        return default
+    wanted = set(names) | set(extra)
+    return [column for column in model.__table__.columns if column.name in wanted]
+
+
+def project_row(row, names):
+    """Row as a dict, narrowed to the requested fields"""
+    data = row._asdict()
+    if names is None:
+        return data
+    return {name: data[name] for name in names if name in data}
+
+
+def rows_response(rows, names=None):
+    """Encode column rows as a JSON list"""
+    return ORJSONResponse([project_row(row, names) for row in rows])
+
+
+def page_response(page, names=None):
+    """Encode a keyset_page() envelope of column rows"""
+    return ORJSONResponse({
+        "items": [project_row(row, names) for row in page["items"]],
+        "next_cursor": page["next_cursor"],
+    })
@@ -0,0 +1,155 @@
+"""
+NDJSON streaming endpoints for full-table sync
+
+Rows are read in primary-key order through a server-side cursor
+(yield_per / stream_results) and written out batch by batch, so memory
+stays flat however large the table is. A consumer that loses the
+connection resumes with after_id set to the last id it received.
+"""
+import logging
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+
+from app.api.serialization import (
+    COMPANY_COLUMNS, CONTACT_COLUMNS, project_row, parse_fields, projected_columns
+)
+from app.models.database import Company, Contact, MonthlyData, SessionLocal, get_engine
+from app.models.search import apply_rating_filters, apply_text_filter
+from app.models.schemas import Company as CompanySchema, Contact as ContactSchema
+from app.models.snapshots import filter_active_month, is_published
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Rows fetched per cursor round trip (and written per response chunk)
+STREAM_BATCH_SIZE = 1000
+
+# is_active is reported from the active_snapshots pointers, not the legacy column
+MONTHLY_DATA_COLUMNS = [
+    column for column in MonthlyData.__table__.columns if column.name != 'is_active'
+] + [is_published().label('is_active')]
+
+
+def iter_ndjson(model, columns, build_filters, after_id, names=None, batch_size=STREAM_BATCH_SIZE):
+    """Yield NDJSON chunks for rows with id > after_id, in id order
+
+    build_filters(query) applies the endpoint's filters. The generator
+    outlives the request dependencies, so it owns its session.
+    """
+    db = SessionLocal()
+    try:
+        query = build_filters(db.query(*columns))
+        if after_id:
+            query = query.filter(model.id > after_id)
+        query = query.order_by(model.id).yield_per(batch_size)
+
+        lines = []
+        for row in query:
+            lines.append(orjson.dumps(project_row(row, names)))
+            if len(lines) >= batch_size:
+                yield b'\n'.join(lines) + b'\n'
+                lines = []
+        if lines:
+            yield b'\n'.join(lines) + b'\n'
+    except Exception as e:
+        # Headers are already sent; the client resumes from the last id it saw
+        logger.error(f"Streaming {model.__tablename__} failed after id {after_id}: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def ndjson_response(model, columns, build_filters, after_id, names=None):
+    """StreamingResponse over iter_ndjson()"""
+    return StreamingResponse(
+        iter_ndjson(model, columns, build_filters, after_id, names),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.get("/companies/stream")
+async def stream_companies(
+    after_id: int = Query(0, ge=0, description="Resume after this company id"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included)"),
+    name: Optional[str] = None,
+    domain: Optional[str] = None,
+    industry: Optional[str] = None,
+    location: Optional[str] = None,
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    max_rating: Optional[float] = Query(None, ge=0, le=5),
+    min_reviews: Optional[int] = Query(None, ge=0),
+    month_key: Optional[str] = None
+):
+    """Stream all matching companies as NDJSON in id order"""
+    names = parse_fields(fields, CompanySchema)
+    dialect = get_engine().dialect.name
+
+    def build_filters(query):
+        for column_name, value in (('name', name), ('domain', domain), ('industry', industry), ('location', location)):
+            if value:
+                query = apply_text_filter(query, Company, column_name, value, dialect)
+        query = apply_rating_filters(query, Company, min_rating, max_rating, min_reviews)
+        if month_key:
+            query = filter_active_month(query, month_key)
+        return query
+
+    columns = projected_columns(Company, names, COMPANY_COLUMNS)
+    return ndjson_response(Company, columns, build_filters, after_id, names)
+
+
+@router.get("/contacts/stream")
+async def stream_contacts(
+    after_id: int = Query(0, ge=0, description="Resume after this contact id"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included)"),
+    company_id: Optional[int] = None,
+    title: Optional[str] = None,
+    department: Optional[str] = None,
+    is_primary: Optional[bool] = None
+):
+    """Stream all matching contacts as NDJSON in id order"""
+    names = parse_fields(fields, ContactSchema)
+    dialect = get_engine().dialect.name
+
+    def build_filters(query):
+        if company_id:
+            query = query.filter(Contact.company_id == company_id)
+        if title:
+            query = apply_text_filter(query, Contact, 'title', title, dialect)
+        if department:
+            query = apply_text_filter(query, Contact, 'department', department, dialect)
+        if is_primary is not None:
+            query = query.filter(Contact.is_primary == is_primary)
+        return query
+
+    columns = projected_columns(Contact, names, CONTACT_COLUMNS)
+    return ndjson_response(Contact, columns, build_filters, after_id, names)
+
+
+@router.get("/monthly-data/stream")
+async def stream_monthly_data(
+    after_id: int = Query(0, ge=0, description="Resume after this monthly_data id"),
+    company_id: Optional[int] = None,
+    month_key: Optional[str] = None,
+    data_type: Optional[str] = None,
+    query_name: Optional[str] = None,
+    is_active: Optional[bool] = Query(None, description="Only rows in (true) or outside (false) the published snapshot")
+):
+    """Stream all matching monthly data rows as NDJSON in id order"""
+    def build_filters(query):
+        if company_id:
+            query = query.filter(MonthlyData.company_id == company_id)
+        if month_key:
+            query = query.filter(MonthlyData.month_key == month_key)
+        if data_type:
+            query = query.filter(MonthlyData.data_type == data_type)
+        if query_name:
+            query = query.filter(MonthlyData.query_name == query_name)
+        if is_active is not None:
+            query = query.filter(is_published() if is_active else ~is_published())
+        return query
+
+    return ndjson_response(MonthlyData, MONTHLY_DATA_COLUMNS, build_filters, after_id)
@@ -0,0 +1,21 @@
+"""
+Configuration loading for LeadTool
+"""
+import os
+import yaml
+
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), '..', 'config')
+
+_config_cache = {}
+
+
+def load_config(name):
+    """Load a YAML configuration file from the config directory (cached)"""
+    if name not in _config_cache:
+        config_path = os.path.join(CONFIG_DIR, f"{name}.yaml")
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                _config_cache[name] = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            _config_cache[name] = {}
+    return _config_cache[name]
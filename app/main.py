@@ -1,30 +1,96 @@
 """
 FastAPI main application for LeadTool
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import logging
 import os
 
-from app.models.database import get_db, Company, Contact, MonthlyData
+from app.models.database import get_db, get_engine, init_db, check_db, Company, Contact, MonthlyData
 from app.models.schemas import (
     Company as CompanySchema, CompanyCreate, CompanyUpdate,
     Contact as ContactSchema, ContactCreate, ContactUpdate,
     CompanyFilter, ContactFilter, ExportRequest
 )
+from app.api.admin import get_admin_token, router as admin_router
+from app.api.bulk import router as bulk_router
+from app.api.changes import router as changes_router
 from app.api.companies import router as companies_router
 from app.api.contacts import router as contacts_router
 from app.api.export import router as export_router
+from app.api.stream import router as stream_router
+from app.api.cache import ResponseCache, ResponseCacheMiddleware
+from app.monitoring.metrics import REGISTRY, MetricsMiddleware, cache_collector, pool_collector
+from app.monitoring.profiling import ProfilingMiddleware
+from app.monitoring.queries import QueryBudgetMiddleware
+from app.monitoring.slow_queries import SlowQuerySourceMiddleware, install_slow_query_recorder
+from app.config import load_config
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Bootstrap the database schema once at startup"""
+    init_db()
+    yield
 
 # Create FastAPI app
 app = FastAPI(
     title="LeadTool API",
     description="Unified Lead Generation and Management System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Add CORS middleware
+# Development mode: flag routes that exceed their SQL statement budget (N+1 loads)
+query_budget_config = load_config('settings').get('query_budget') or {}
+if query_budget_config.get('enabled', False):
+    app.add_middleware(
+        QueryBudgetMiddleware,
+        default_budget=query_budget_config.get('default_budget', 20),
+        budgets=query_budget_config.get('routes'),
+        mode=query_budget_config.get('mode', 'warn')
+    )
+
+# Cache read-only GET responses until the data version changes
+cache_config = load_config('settings').get('cache') or {}
+response_cache = ResponseCache.from_config(cache_config)
+app.state.response_cache = response_cache
+if cache_config.get('enabled', True):
+    app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+
+# On-demand profiling of requests that send the profiling token (X-Profile header)
+profiling_config = load_config('settings').get('profiling') or {}
+profiling_token = os.getenv('LEADTOOL_PROFILE_TOKEN') or profiling_config.get('token')
+if profiling_config.get('enabled', False):
+    if profiling_token:
+        app.add_middleware(
+            ProfilingMiddleware,
+            token=profiling_token,
+            output_dir=profiling_config.get('output_dir', 'logs/profiles'),
+            interval=profiling_config.get('sample_interval_ms', 2) / 1000
+        )
+    else:
+        logger.warning("Profiling is enabled but LEADTOOL_PROFILE_TOKEN is not set; profiling stays off")
+
+# Slow-query log with EXPLAIN plans, attributed to the calling route
+if install_slow_query_recorder(load_config('settings').get('slow_queries') or {}):
+    app.add_middleware(SlowQuerySourceMiddleware)
+
+# Request/DB metrics for /metrics (outside the cache, so cached responses are measured too)
+monitoring_config = load_config('settings').get('monitoring') or {}
+metrics_enabled = monitoring_config.get('metrics', True)
+if metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    REGISTRY.add_collector(pool_collector(get_engine))
+    REGISTRY.add_collector(cache_collector(response_cache))
+
+# Add CORS middleware last (outermost): CORS headers depend on each request's
+# Origin, so they must be added after the response cache replays an entry
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Configure appropriately for production
@@ -33,10 +99,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
+# Include routers (bulk and stream routes first: /companies/bulk must not match /companies/{company_id})
+app.include_router(bulk_router, prefix="/api/v1", tags=["bulk"])
+app.include_router(stream_router, prefix="/api/v1", tags=["stream"])
 app.include_router(companies_router, prefix="/api/v1", tags=["companies"])
 app.include_router(contacts_router, prefix="/api/v1", tags=["contacts"])
 app.include_router(export_router, prefix="/api/v1", tags=["export"])
+app.include_router(changes_router, prefix="/api/v1", tags=["changes"])
+
+# Slow-query and cache internals need the admin token (not mounted without one)
+if get_admin_token():
+    app.include_router(admin_router, tags=["admin"])
+else:
+    logger.info("LEADTOOL_ADMIN_TOKEN is not set; admin endpoints are not mounted")
 
 @app.get("/")
 async def root():
@@ -52,6 +127,20 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check endpoint (verifies database connectivity)"""
+    if not check_db():
+        return JSONResponse(status_code=503, content={"status": "unavailable"})
+    return {"status": "ready"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text-format metrics"""
+    if not metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
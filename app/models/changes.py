@@ -0,0 +1,45 @@
+"""
+Append-only change log for incremental sync
+
+Every write path (API handlers, bulk endpoints, scraper pipeline) records
+one row per inserted, updated or deleted company or contact, in the same
+transaction as the write. Mirrors read the log after the last id they
+applied instead of re-downloading whole tables.
+
+Writers bump the data version first: that UPDATE locks the single
+counter row until commit, so change ids are allocated in commit order
+and a reader never sees id N+1 before id N is visible.
+"""
+from sqlalchemy import insert, select
+
+from app.models.database import ChangeLog, Contact
+
+CHANGE_ENTITIES = ('companies', 'contacts')
+CHANGE_OPS = ('insert', 'update', 'delete')
+
+
+def record_changes(bind, entity, op, ids):
+    """Append one change row per id (bind is a Session or a Connection)"""
+    rows = [{"entity": entity, "entity_id": entity_id, "op": op} for entity_id in ids if entity_id is not None]
+    if rows:
+        bind.execute(insert(ChangeLog), rows)
+
+
+def record_company_deletes(bind, company_ids):
+    """Log deleted companies and the contacts that go with them (call before deleting)"""
+    company_ids = list(company_ids)
+    if not company_ids:
+        return
+    contact_ids = bind.execute(
+        select(Contact.id).where(Contact.company_id.in_(company_ids))
+    ).scalars().all()
+    record_changes(bind, 'contacts', 'delete', contact_ids)
+    record_changes(bind, 'companies', 'delete', company_ids)
+
+
+def read_changes(session, since=0, limit=1000, entities=None):
+    """Return up to limit change rows after the since cursor, in log order"""
+    query = select(ChangeLog).where(ChangeLog.id > since)
+    if entities:
+        query = query.where(ChangeLog.entity.in_(entities))
+    return session.execute(query.order_by(ChangeLog.id).limit(limit)).scalars().all()
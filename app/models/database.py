@@ -1,21 +1,113 @@
 """
 Database models for LeadTool using SQLAlchemy
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index, create_engine
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, ForeignKey, Boolean, Index, create_engine, event, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.sql import func
 from datetime import datetime
+import logging
 import os
+import time
+
+from app.config import load_config
+from app.models.geo import encode_geohash
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
 # Database URL configuration
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./data/leadtool.db')
 
-# Create engine and session
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# SQLite profile defaults (overridable in config/database.yaml under "sqlite")
+SQLITE_PROFILE_DEFAULTS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 268435456,  # 256 MB
+    'cache_size': -65536,  # 64 MB (negative values are KiB)
+    'busy_timeout': 5000,  # milliseconds
+    'foreign_keys': True,
+}
+
+
+def get_sqlite_profile():
+    """Get the SQLite connection profile merged with configured overrides"""
+    profile = dict(SQLITE_PROFILE_DEFAULTS)
+    profile.update(load_config('database').get('sqlite') or {})
+    return profile
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the SQLite high-throughput profile to a new DBAPI connection"""
+    profile = get_sqlite_profile()
+    cursor = dbapi_connection.cursor()
+    try:
+        # WAL lets the API and dashboard keep reading while the pipeline writes
+        cursor.execute(f"PRAGMA journal_mode={profile['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous={profile['synchronous']}")
+        cursor.execute(f"PRAGMA mmap_size={int(profile['mmap_size'])}")
+        cursor.execute(f"PRAGMA cache_size={int(profile['cache_size'])}")
+        cursor.execute(f"PRAGMA busy_timeout={int(profile['busy_timeout'])}")
+        cursor.execute(f"PRAGMA foreign_keys={'ON' if profile['foreign_keys'] else 'OFF'}")
+    finally:
+        cursor.close()
+
+
+def configure_engine(engine):
+    """Attach dialect-specific connection hooks to an engine"""
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', apply_sqlite_pragmas)
+    return engine
+
+
+def run_sqlite_maintenance(engine):
+    """Refresh query planner statistics and checkpoint the WAL (SQLite only)"""
+    if engine.dialect.name != 'sqlite':
+        return None
+    
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA optimize")
+        busy, log_frames, checkpointed = conn.exec_driver_sql(
+            "PRAGMA wal_checkpoint(TRUNCATE)"
+        ).one()
+    
+    logger.info(
+        f"SQLite maintenance: optimize done, WAL checkpoint "
+        f"busy={busy} log={log_frames} checkpointed={checkpointed}"
+    )
+    return {"busy": busy, "log_frames": log_frames, "checkpointed": checkpointed}
+
+
+# Engine and session factory are created lazily so that importing the models
+# (dashboard reruns, scheduler, export scripts) never touches the database
+_engine = None
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+_schema_ready = False
+
+
+def get_engine():
+    """Get the shared engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        _engine = configure_engine(create_engine(DATABASE_URL))
+        _session_factory.configure(bind=_engine)
+    return _engine
+
+
+def SessionLocal(**kwargs):
+    """Create a new session bound to the shared engine"""
+    get_engine()
+    return _session_factory(**kwargs)
+
+
+def __getattr__(name):
+    # Backwards compatible access to the module-level ``engine``
+    if name == 'engine':
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_db():
     """Dependency to get database session"""
@@ -42,26 +134,51 @@ class Company(Base):
     category = Column(String(100), nullable=True)  # Business category/type
     address = Column(Text, nullable=True)  # Full business address
     phone = Column(String(50), nullable=True)  # Business phone number
-    rating = Column(String(10), nullable=True)  # Google Maps rating
+    rating = Column(Float, nullable=True)  # Google Maps rating (0-5)
     review_count = Column(Integer, nullable=True)  # Number of reviews
     source = Column(String(50), nullable=True, default='Google Maps')  # Data source
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True)  # Derived from latitude/longitude
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
     
     # Relationships
     contacts = relationship("Contact", back_populates="company", cascade="all, delete-orphan")
     monthly_data = relationship("MonthlyData", back_populates="company", cascade="all, delete-orphan")
+    metrics = relationship("CompanyMetric", back_populates="company", cascade="all, delete-orphan")
     
     # Indexes for performance
     __table_args__ = (
         Index('idx_company_name_domain', 'name', 'domain'),
-        Index('idx_company_category', 'category'),
-        Index('idx_company_location', 'location'),
         Index('idx_company_source', 'source'),
+        # Case-insensitive exact text filters compare lower(column)
+        Index('idx_company_name_lower', func.lower(name)),
+        Index('idx_company_domain_lower', func.lower(domain)),
+        Index('idx_company_category_lower', func.lower(category)),
+        Index('idx_company_location_lower', func.lower(location)),
+        Index('idx_company_industry_lower', func.lower(industry)),
+        Index('idx_company_created_at', 'created_at', 'id'),
+        Index('idx_company_updated_at', 'updated_at', 'id'),
+        # Range filters and top-N sorts on rating / review count
+        Index('idx_company_rating', 'rating', 'id'),
+        Index('idx_company_review_count', 'review_count', 'id'),
+        # Radius search scans geohash prefix ranges
+        Index('idx_company_geohash', 'geohash'),
     )
 
 
+@event.listens_for(Company, 'before_insert')
+@event.listens_for(Company, 'before_update')
+def _set_company_geohash(mapper, connection, target):
+    """Keep the geohash in step with the coordinates"""
+    if target.latitude is not None and target.longitude is not None:
+        target.geohash = encode_geohash(target.latitude, target.longitude)
+    else:
+        target.geohash = None
+
+
 class Contact(Base):
     """Contact information model"""
     __tablename__ = "contacts"
@@ -77,7 +194,7 @@ class Contact(Base):
     linkedin = Column(String(500), nullable=True)
     is_primary = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
     
     # Relationships
     company = relationship("Company", back_populates="contacts")
@@ -85,6 +202,11 @@ class Contact(Base):
     # Indexes for performance
     __table_args__ = (
         Index('idx_contact_company_id', 'company_id'),
+        Index('idx_contact_title_lower', func.lower(title)),
+        Index('idx_contact_department_lower', func.lower(department)),
+        Index('idx_contact_created_at', 'created_at', 'id'),
+        Index('idx_contact_updated_at', 'updated_at', 'id'),
+        Index('idx_contact_last_name', 'last_name', 'id'),
     )
 
 
@@ -107,10 +229,153 @@ class MonthlyData(Base):
     
     # Indexes for performance
     __table_args__ = (
-        Index('idx_monthly_company_month', 'company_id', 'month_key'),
+        # Company-month probes; query_name makes the published-month semi-join index-only
+        Index('idx_monthly_company_month_type_query', 'company_id', 'month_key', 'data_type', 'query_name'),
         Index('idx_monthly_type_month', 'data_type', 'month_key'),
         Index('idx_monthly_query', 'query_name'),
+        # Queries scraped in a month (publish_month), read from the index alone
+        Index('idx_monthly_month_query_company', 'month_key', 'query_name', 'company_id'),
+    )
+
+
+class ActiveSnapshot(Base):
+    """Published month per search query (replaces bulk is_active flag updates)"""
+    __tablename__ = "active_snapshots"
+    
+    query_name = Column(String(255), primary_key=True)
+    month_key = Column(String(7), nullable=False)  # Format: "2025-01"
+    published_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class CompanyMetric(Base):
+    """Typed per-month metrics for a company (compact time series)"""
+    __tablename__ = "company_metrics"
+    
+    company_id = Column(Integer, ForeignKey("companies.id"), primary_key=True)
+    month_key = Column(String(7), primary_key=True)  # Format: "2025-01"
+    rating = Column(Float, nullable=True)
+    review_count = Column(Integer, nullable=True)
+    phone = Column(String(50), nullable=True)
+    has_phone = Column(Boolean, nullable=False, default=False)
+    has_website = Column(Boolean, nullable=False, default=False)
+    has_address = Column(Boolean, nullable=False, default=False)
+    
+    # Relationships
+    company = relationship("Company", back_populates="metrics")
+    
+    # Month-wide scans (trends, diffs) read only the index
+    __table_args__ = (
+        Index('idx_metric_month_company', 'month_key', 'company_id', 'review_count', 'rating'),
+    )
+
+
+class DataVersion(Base):
+    """Counter bumped on every data change (invalidates cached API responses)"""
+    __tablename__ = "data_versions"
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class StatRollup(Base):
+    """Precomputed row counts per entity, dimension and value for the stats endpoints"""
+    __tablename__ = "stat_rollups"
+    
+    entity = Column(String(20), primary_key=True)  # "companies" or "contacts"
+    dimension = Column(String(50), primary_key=True)  # e.g. "industry", "month", "total"
+    value = Column(String(255), primary_key=True)  # "" for totals
+    count = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ChangeLog(Base):
+    """Append-only log of company/contact writes (the id is the incremental sync cursor)"""
+    __tablename__ = "change_log"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(20), nullable=False)  # "companies" or "contacts"
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)  # "insert", "update" or "delete"
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Per-entity feeds read (entity, id > cursor)
+        Index('idx_change_log_entity_id', 'entity', 'id'),
     )
 
-# Create tables
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+
+def check_db():
+    """Readiness check: return True if the database accepts connections"""
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except OperationalError as e:
+        logger.warning(f"Database not ready: {e}")
+        return False
+
+
+def create_schema(engine):
+    """Create missing tables (monthly_data is month-partitioned on PostgreSQL)"""
+    if engine.dialect.name == 'postgresql':
+        from app.models.partitions import create_partitioned_monthly_data, ensure_upcoming_partitions
+        
+        # Tables monthly_data references must exist before the partitioned parent
+        Base.metadata.create_all(bind=engine, tables=[
+            table for table in Base.metadata.sorted_tables
+            if table.name != MonthlyData.__tablename__
+        ])
+        with engine.begin() as conn:
+            create_partitioned_monthly_data(conn)
+            ensure_upcoming_partitions(conn)
+    
+    Base.metadata.create_all(bind=engine)
+    
+    from app.models.search import ensure_fulltext_indexes, ensure_trigram_indexes
+    from app.models.metrics import bootstrap_company_metrics
+    from app.models.migrations import run_migrations
+    from app.models.rollups import seed_rollups
+    from app.models.snapshots import bootstrap_active_snapshots
+    from app.models.versions import ensure_data_version
+    with engine.begin() as conn:
+        # Column changes on existing tables, before indexes on those columns
+        run_migrations(conn)
+        
+        # create_all skips existing tables, so add indexes introduced since;
+        # IF NOT EXISTS because reflection does not see expression indexes
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+        
+        bootstrap_active_snapshots(conn)
+        bootstrap_company_metrics(conn)
+        ensure_data_version(conn)
+        seed_rollups(conn)
+    
+    # Separate transactions: a missing FTS5 module or pg_trgm privilege
+    # must not roll back the schema above
+    with engine.begin() as conn:
+        ensure_fulltext_indexes(conn)
+    with engine.begin() as conn:
+        ensure_trigram_indexes(conn)
+
+
+def init_db(retries=5, retry_delay=2.0):
+    """Wait for the database to become reachable and create missing tables"""
+    global _schema_ready
+    engine = get_engine()
+    if _schema_ready:
+        return engine
+    
+    for attempt in range(1, retries + 1):
+        if check_db():
+            break
+        if attempt == retries:
+            raise RuntimeError(f"Database not reachable after {retries} attempts")
+        time.sleep(retry_delay)
+    
+    create_schema(engine)
+    _schema_ready = True
+    logger.info("Database schema ready")
+    return engine
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Set-based month-over-month diff of scraped companies
+"""
+import json
+
+from sqlalchemy import exists, or_, select
+from sqlalchemy.orm import aliased
+
+from app.models.database import Company, CompanyMetric
+
+# Typed metric columns compared between months
+DIFF_FIELDS = ['rating', 'review_count', 'phone', 'has_website', 'has_address']
+
+
+def _presence_statement(in_month, missing_month):
+    """Companies with metrics in in_month but not in missing_month (NOT EXISTS anti-join)"""
+    present = aliased(CompanyMetric)
+    absent = aliased(CompanyMetric)
+    return select(Company.id, Company.name, Company.address).select_from(present).join(
+        Company, Company.id == present.company_id
+    ).where(
+        present.month_key == in_month,
+        ~exists().where(
+            absent.company_id == present.company_id,
+            absent.month_key == missing_month
+        )
+    ).order_by(Company.id)
+
+
+def added_statement(from_month, to_month):
+    """Companies present in to_month but not in from_month"""
+    return _presence_statement(to_month, from_month)
+
+
+def removed_statement(from_month, to_month):
+    """Companies present in from_month but not in to_month"""
+    return _presence_statement(from_month, to_month)
+
+
+def changed_statement(from_month, to_month):
+    """Companies present in both months whose metrics differ"""
+    before = aliased(CompanyMetric)
+    after = aliased(CompanyMetric)
+
+    columns = [Company.id, Company.name, Company.address]
+    differences = []
+    for field in DIFF_FIELDS:
+        old_value = getattr(before, field)
+        new_value = getattr(after, field)
+        columns += [old_value.label(f"{field}_from"), new_value.label(f"{field}_to")]
+        differences.append(old_value.is_distinct_from(new_value))
+
+    return select(*columns).select_from(before).join(
+        after, (after.company_id == before.company_id) & (after.month_key == to_month)
+    ).join(
+        Company, Company.id == before.company_id
+    ).where(
+        before.month_key == from_month,
+        or_(*differences)
+    ).order_by(Company.id)
+
+
+def iter_month_diff(session, from_month, to_month, batch_size=1000):
+    """Yield NDJSON lines for added, removed and changed companies"""
+    sections = [
+        ('added', added_statement(from_month, to_month)),
+        ('removed', removed_statement(from_month, to_month)),
+        ('changed', changed_statement(from_month, to_month)),
+    ]
+
+    for change, statement in sections:
+        result = session.execute(statement.execution_options(yield_per=batch_size))
+        for row in result.mappings():
+            record = {
+                'change': change,
+                'company_id': row['id'],
+                'name': row['name'],
+                'address': row['address'],
+            }
+            if change == 'changed':
+                record['fields'] = {
+                    field: {'from': row[f"{field}_from"], 'to': row[f"{field}_to"]}
+                    for field in DIFF_FIELDS
+                    if row[f"{field}_from"] != row[f"{field}_to"]
+                }
+            yield json.dumps(record) + '\n'
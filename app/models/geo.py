@@ -0,0 +1,112 @@
+"""
+Geohash helpers for radius search on company coordinates
+
+A geohash prefix is a rectangular cell, so a radius search becomes a few
+B-tree range scans on companies.geohash (same index on SQLite and PostgreSQL).
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # ~5 m cells
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Return (lat_degrees, lon_degrees) covered by a geohash cell"""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def degree_offsets(latitude, radius_km):
+    """Return (dlat, dlon): the radius in degrees of latitude and of longitude at latitude"""
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return dlat, dlon
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return (min_lat, max_lat, lon_ranges) around a point
+
+    lon_ranges holds one (min_lon, max_lon) pair, or two when the box
+    crosses the antimeridian (e.g. (179.9, 180.0) and (-180.0, -179.9)).
+    """
+    dlat, dlon = degree_offsets(latitude, radius_km)
+    min_lat, max_lat = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    if dlon >= 180.0:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+    
+    min_lon, max_lon = longitude - dlon, longitude + dlon
+    if min_lon < -180.0:
+        lon_ranges = [(-180.0, max_lon), (min_lon + 360.0, 180.0)]
+    elif max_lon > 180.0:
+        lon_ranges = [(min_lon, 180.0), (-180.0, max_lon - 360.0)]
+    else:
+        lon_ranges = [(min_lon, max_lon)]
+    return min_lat, max_lat, lon_ranges
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """Geohash prefixes (at most 3x3 cells per longitude range) that cover the radius around a point"""
+    min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude, radius_km)
+    dlat, dlon = degree_offsets(latitude, radius_km)
+    
+    # Finest precision whose cells are at least as large as the radius
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lon = cell_size(candidate)
+        if cell_lat >= max_lat - latitude and cell_lon >= dlon:
+            precision = candidate
+            break
+    cell_lat, cell_lon = cell_size(precision)
+    
+    cells = set()
+    lat = min_lat
+    while True:
+        for min_lon, max_lon in lon_ranges:
+            lon = min_lon
+            while True:
+                cells.add(encode_geohash(lat, lon, precision))
+                if lon >= max_lon:
+                    break
+                lon = min(lon + cell_lon, max_lon)
+        if lat >= max_lat:
+            break
+        lat = min(lat + cell_lat, max_lat)
+    return sorted(cells)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two coordinates in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
@@ -0,0 +1,160 @@
+"""
+Per-company metric time series
+
+One narrow, typed row per company and month replaces parsing the
+MonthlyData.raw_data JSON blobs to chart ratings and review counts.
+"""
+import json
+import logging
+import re
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.orm import aliased
+
+from app.models.database import Company, CompanyMetric, MonthlyData
+
+logger = logging.getLogger(__name__)
+
+# Metrics accepted by the trends endpoint
+TREND_METRICS = ['review_count', 'rating']
+
+NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)?')
+
+BOOTSTRAP_BATCH_SIZE = 5000
+
+
+def parse_rating(value):
+    """Return a rating as float ("4,5 stars" -> 4.5), or None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = NUMBER_RE.search(str(value))
+    return float(match.group(0).replace(',', '.')) if match else None
+
+
+def parse_count(value):
+    """Return a review count as int ("1,234" -> 1234), or None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, int):
+        return value
+    digits = re.sub(r'\D', '', str(value))
+    return int(digits) if digits else None
+
+
+def metric_values(company_data):
+    """Typed metric columns for a scraped company record"""
+    return {
+        'rating': parse_rating(company_data.get('rating')),
+        'review_count': parse_count(company_data.get('review_count')),
+        'phone': company_data.get('phone') or None,
+        'has_phone': bool(company_data.get('phone')),
+        'has_website': bool(company_data.get('website')),
+        'has_address': bool(company_data.get('address')),
+    }
+
+
+def record_company_metric(session, company_id, month_key, company_data):
+    """Insert or update the metric row for a company and month"""
+    session.merge(CompanyMetric(
+        company_id=company_id,
+        month_key=month_key,
+        **metric_values(company_data)
+    ))
+
+
+def _iter_latest_company_records(conn):
+    """Yield batches of (company_id, month_key, company_data) from the latest blob per company and month"""
+    latest = select(func.max(MonthlyData.id)).where(
+        MonthlyData.data_type == 'company'
+    ).group_by(MonthlyData.company_id, MonthlyData.month_key)
+    result = conn.execute(
+        select(MonthlyData.company_id, MonthlyData.month_key, MonthlyData.raw_data)
+        .where(MonthlyData.id.in_(latest))
+        .order_by(MonthlyData.id)
+    )
+    
+    while True:
+        rows = result.fetchmany(BOOTSTRAP_BATCH_SIZE)
+        if not rows:
+            break
+        batch = []
+        for company_id, month_key, raw_data in rows:
+            try:
+                company_data = json.loads(raw_data) if raw_data else {}
+            except ValueError:
+                company_data = {}
+            batch.append((company_id, month_key, company_data))
+        yield batch
+
+
+def bootstrap_company_metrics(conn):
+    """Backfill metrics from MonthlyData blobs when the table is still empty"""
+    if conn.execute(select(CompanyMetric.company_id).limit(1)).first():
+        return 0
+    
+    total = 0
+    for records in _iter_latest_company_records(conn):
+        conn.execute(insert(CompanyMetric), [
+            {'company_id': company_id, 'month_key': month_key, **metric_values(company_data)}
+            for company_id, month_key, company_data in records
+        ])
+        total += len(records)
+    
+    if total:
+        logger.info(f"Backfilled {total} company metric rows from monthly data")
+    return total
+
+
+def backfill_metric_phones(conn):
+    """Fill company_metrics.phone from MonthlyData blobs (rows recorded before the column existed)"""
+    statement = update(CompanyMetric).where(
+        CompanyMetric.company_id == bindparam('b_company_id'),
+        CompanyMetric.month_key == bindparam('b_month_key')
+    ).values(phone=bindparam('b_phone'))
+    
+    total = 0
+    for records in _iter_latest_company_records(conn):
+        params = [
+            {'b_company_id': company_id, 'b_month_key': month_key, 'b_phone': company_data['phone']}
+            for company_id, month_key, company_data in records
+            if company_data.get('phone')
+        ]
+        if params:
+            conn.execute(statement, params)
+            total += len(params)
+    
+    if total:
+        logger.info(f"Backfilled {total} company metric phone numbers from monthly data")
+    return total
+
+
+def top_movers_statement(from_month, to_month, metric='review_count', limit=50, descending=True):
+    """Companies ranked by the change of a metric between two months"""
+    if metric not in TREND_METRICS:
+        raise ValueError(f"Unsupported trend metric: {metric!r}")
+    before = aliased(CompanyMetric)
+    after = aliased(CompanyMetric)
+    old_value = getattr(before, metric)
+    new_value = getattr(after, metric)
+    change = (new_value - old_value).label('change')
+    
+    return select(
+        Company.id.label('company_id'),
+        Company.name,
+        old_value.label('from_value'),
+        new_value.label('to_value'),
+        change
+    ).select_from(before).join(
+        after, (after.company_id == before.company_id) & (after.month_key == to_month)
+    ).join(
+        Company, Company.id == before.company_id
+    ).where(
+        before.month_key == from_month,
+        old_value.isnot(None),
+        new_value.isnot(None)
+    ).order_by(
+        change.desc() if descending else change.asc(),
+        Company.id
+    ).limit(limit)
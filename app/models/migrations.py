@@ -0,0 +1,197 @@
+"""
+In-place schema migrations for existing LeadTool databases
+
+create_all() only creates missing tables, so column type changes on
+existing tables are applied here. Every migration checks the live schema
+first and is a no-op once applied.
+"""
+import logging
+import sqlite3
+
+from sqlalchemy import Float, MetaData, Numeric, inspect, text
+
+logger = logging.getLogger(__name__)
+
+# Ratings are parsed like new scrapes (metrics.parse_rating): the first number,
+# with a decimal comma ("4.5 stars" -> 4.5, "4,5" -> 4.5); no number becomes NULL.
+# SQLite has no regular expressions, so it calls parse_rating itself.
+SQLITE_RATING_EXPR = "parse_rating(rating)"
+POSTGRES_RATING_EXPR = (
+    "replace(substring(rating from '[0-9]+(?:[.,][0-9]+)?'), ',', '.')::double precision"
+)
+
+
+def _register_rating_parser(conn):
+    """Make parse_rating() callable from SQL on a SQLite connection"""
+    from app.models.metrics import parse_rating
+    
+    conn.connection.dbapi_connection.create_function('parse_rating', 1, parse_rating)
+
+
+def _column_type(conn, table_name, column_name):
+    """Return the reflected type of a column, or None if it does not exist"""
+    for column in inspect(conn).get_columns(table_name):
+        if column['name'] == column_name:
+            return column['type']
+    return None
+
+
+def _rebuild_sqlite_table(conn, table, expressions, prepare=None):
+    """Recreate a SQLite table from its model definition, copying the rows across
+
+    For SQLite before 3.35, which cannot drop a column. expressions maps
+    column names to SQL computing the new value from the old row. Indexes
+    are recreated by create_schema and FTS sync triggers by the full-text
+    setup, both of which run after the migrations.
+    
+    Dropping a parent table needs foreign_keys off, which SQLite only
+    accepts outside a transaction, so the rebuild commits on its own
+    connection before the caller's transaction writes anything; prepare,
+    if given, is called with that connection first.
+    """
+    from sqlalchemy.schema import CreateTable
+    
+    old_columns = {column['name'] for column in inspect(conn).get_columns(table.name)}
+    new_table = table.to_metadata(MetaData(), name=f"{table.name}_rebuild")
+    columns = [column.name for column in table.columns if column.name in old_columns]
+    
+    with conn.engine.connect() as rebuild:
+        if prepare is not None:
+            prepare(rebuild)
+        foreign_keys = rebuild.exec_driver_sql("PRAGMA foreign_keys").scalar()
+        rebuild.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        try:
+            rebuild.exec_driver_sql("BEGIN")
+            rebuild.execute(CreateTable(new_table))
+            rebuild.execute(text(
+                f"INSERT INTO {new_table.name} ({', '.join(columns)}) "
+                f"SELECT {', '.join(expressions.get(name, name) for name in columns)} FROM {table.name}"
+            ))
+            rebuild.execute(text(f"DROP TABLE {table.name}"))
+            rebuild.execute(text(f"ALTER TABLE {new_table.name} RENAME TO {table.name}"))
+            violations = rebuild.exec_driver_sql("PRAGMA foreign_key_check").all()
+            if violations:
+                raise RuntimeError(f"Rebuilding {table.name} broke {len(violations)} foreign key references")
+            rebuild.commit()
+        except Exception:
+            rebuild.rollback()
+            raise
+        finally:
+            rebuild.exec_driver_sql(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+            rebuild.commit()
+
+
+def migrate_rating_to_float(conn):
+    """Convert companies.rating from VARCHAR to a floating point column"""
+    column_type = _column_type(conn, 'companies', 'rating')
+    if column_type is None or isinstance(column_type, (Float, Numeric)):
+        return False
+    
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        if sqlite3.sqlite_version_info < (3, 35, 0):
+            from app.models.database import Company
+            
+            # No DROP COLUMN before 3.35: rebuild the table with the REAL column
+            _rebuild_sqlite_table(conn, Company.__table__, {'rating': SQLITE_RATING_EXPR}, prepare=_register_rating_parser)
+        else:
+            _register_rating_parser(conn)
+            # SQLite cannot change a column type: copy into a new column and swap
+            conn.execute(text("ALTER TABLE companies ADD COLUMN rating_numeric REAL"))
+            conn.execute(text(f"UPDATE companies SET rating_numeric = {SQLITE_RATING_EXPR}"))
+            conn.execute(text("ALTER TABLE companies DROP COLUMN rating"))
+            conn.execute(text("ALTER TABLE companies RENAME COLUMN rating_numeric TO rating"))
+    elif dialect == 'postgresql':
+        conn.execute(text(
+            f"ALTER TABLE companies ALTER COLUMN rating TYPE DOUBLE PRECISION USING ({POSTGRES_RATING_EXPR})"
+        ))
+    else:
+        # Numeric rating filters would compare text on the old column
+        raise RuntimeError(f"No migration of companies.rating to a numeric column for dialect {dialect}")
+    
+    logger.info("Migrated companies.rating to a numeric column")
+    return True
+
+
+def add_company_geo_columns(conn):
+    """Add the latitude, longitude and geohash columns to companies"""
+    added = []
+    for column_name, column_type in (
+        ('latitude', 'FLOAT'), ('longitude', 'FLOAT'), ('geohash', 'VARCHAR(12)')
+    ):
+        if _column_type(conn, 'companies', column_name) is None:
+            conn.execute(text(f"ALTER TABLE companies ADD COLUMN {column_name} {column_type}"))
+            added.append(column_name)
+    
+    if added:
+        logger.info(f"Added companies columns: {', '.join(added)}")
+    return added
+
+
+def add_company_metric_phone(conn):
+    """Add company_metrics.phone and fill it from the scraped monthly data"""
+    if _column_type(conn, 'company_metrics', 'phone') is not None:
+        return False
+    
+    from app.models.metrics import backfill_metric_phones
+    
+    conn.execute(text("ALTER TABLE company_metrics ADD COLUMN phone VARCHAR(50)"))
+    backfill_metric_phones(conn)
+    logger.info("Added company_metrics.phone")
+    return True
+
+
+# Indexes replaced by wider ones; no query plan uses them any more
+OBSOLETE_INDEXES = {
+    'companies': [
+        'idx_company_category',  # exact filters compare lower(category): idx_company_category_lower
+        'idx_company_location',  # same for location
+        'idx_company_industry',  # same for industry
+    ],
+    'contacts': [
+        'idx_contact_title',  # exact filters compare lower(title): idx_contact_title_lower
+        'idx_contact_department',  # same for department
+    ],
+    'monthly_data': [
+        'idx_monthly_month_query',  # (month_key, query_name): idx_monthly_month_query_company
+        'idx_monthly_company_month',  # (company_id, month_key): idx_monthly_company_month_type_query
+        'idx_monthly_company_month_type',  # (company_id, month_key, data_type): same
+    ],
+}
+
+
+def _index_names(conn, table_name):
+    """Names of a table's indexes, including expression indexes reflection skips"""
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        return set(conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"
+        ), {"table": table_name}).scalars())
+    if dialect == 'postgresql':
+        return set(conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table"
+        ), {"table": table_name}).scalars())
+    return {index['name'] for index in inspect(conn).get_indexes(table_name)}
+
+
+def drop_obsolete_indexes(conn):
+    """Drop indexes superseded by wider indexes (they only cost writes)"""
+    dropped = []
+    for table_name, index_names in OBSOLETE_INDEXES.items():
+        existing = _index_names(conn, table_name)
+        for index_name in index_names:
+            if index_name in existing:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+                dropped.append(index_name)
+    
+    if dropped:
+        logger.info(f"Dropped obsolete indexes: {', '.join(dropped)}")
+    return dropped
+
+
+def run_migrations(conn):
+    """Apply all pending in-place migrations"""
+    migrate_rating_to_float(conn)
+    add_company_geo_columns(conn)
+    add_company_metric_phone(conn)
+    drop_obsolete_indexes(conn)
@@ -0,0 +1,129 @@
+"""
+PostgreSQL month partitioning for the monthly_data table
+"""
+import logging
+import re
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from app.models.database import MonthlyData
+
+logger = logging.getLogger(__name__)
+
+MONTH_KEY_RE = re.compile(r'^\d{4}-\d{2}$')
+PARTITION_NAME_RE = re.compile(r'^monthly_data_(\d{4})_(\d{2})$')
+
+# Postgres requires the partition key to be part of the primary key, so the
+# partitioned parent uses (id, month_key). Columns mirror the MonthlyData model.
+CREATE_PARTITIONED_MONTHLY_DATA = """
+CREATE TABLE monthly_data (
+    id SERIAL NOT NULL,
+    company_id INTEGER NOT NULL REFERENCES companies (id),
+    month_key VARCHAR(7) NOT NULL,
+    data_type VARCHAR(50) NOT NULL,
+    raw_data TEXT,
+    source_url VARCHAR(1000),
+    query_name VARCHAR(255),
+    scraped_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    is_active BOOLEAN,
+    PRIMARY KEY (id, month_key)
+) PARTITION BY LIST (month_key)
+"""
+
+
+def next_month_key(month_key):
+    """Return the month key following month_key ("2025-12" -> "2026-01")"""
+    year, month = (int(part) for part in month_key.split('-'))
+    if month == 12:
+        return f"{year + 1}-01"
+    return f"{year}-{month + 1:02d}"
+
+
+def partition_name(month_key):
+    """Return the partition table name for a month key"""
+    if not MONTH_KEY_RE.match(month_key):
+        raise ValueError(f"Invalid month key: {month_key!r}")
+    return f"monthly_data_{month_key.replace('-', '_')}"
+
+
+def is_partitioned(conn):
+    """Check whether monthly_data is a partitioned table on this connection"""
+    if conn.dialect.name != 'postgresql':
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+    ), {"name": MonthlyData.__tablename__}).first() is not None
+
+
+def create_partitioned_monthly_data(conn):
+    """Create monthly_data as a LIST-partitioned table if it does not exist yet"""
+    if conn.dialect.name != 'postgresql':
+        return False
+    if inspect(conn).has_table(MonthlyData.__tablename__):
+        if not is_partitioned(conn):
+            logger.info("monthly_data exists and is not partitioned; keeping row-based retention")
+        return False
+
+    conn.execute(text(CREATE_PARTITIONED_MONTHLY_DATA))
+    for index in MonthlyData.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+    logger.info("Created partitioned monthly_data table")
+    return True
+
+
+def ensure_month_partition(conn, month_key):
+    """Create the partition holding month_key if it does not exist yet"""
+    if not is_partitioned(conn):
+        return False
+    name = partition_name(month_key)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} "
+        f"PARTITION OF monthly_data FOR VALUES IN ('{month_key}')"
+    ))
+    return True
+
+
+def ensure_upcoming_partitions(conn, month_key=None, months_ahead=1):
+    """Create partitions for month_key (default: current month) and the months after it"""
+    month_key = month_key or datetime.now().strftime("%Y-%m")
+    created = []
+    for _ in range(months_ahead + 1):
+        if ensure_month_partition(conn, month_key):
+            created.append(month_key)
+        month_key = next_month_key(month_key)
+    return created
+
+
+def list_month_partitions(conn):
+    """Return {month_key: partition_name} for all attached monthly_data partitions"""
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name AND pg_table_is_visible(p.oid)"
+    ), {"name": MonthlyData.__tablename__}).scalars()
+
+    partitions = {}
+    for name in rows:
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            partitions[f"{match.group(1)}-{match.group(2)}"] = name
+    return partitions
+
+
+def drop_partitions_before(conn, cutoff_month, detach_only=False):
+    """Detach (and by default drop) every monthly partition older than cutoff_month"""
+    removed = []
+    for month_key, name in sorted(list_month_partitions(conn).items()):
+        if month_key >= cutoff_month:
+            continue
+        conn.execute(text(f"ALTER TABLE monthly_data DETACH PARTITION {name}"))
+        if not detach_only:
+            conn.execute(text(f"DROP TABLE {name}"))
+        removed.append(month_key)
+        logger.info(f"{'Detached' if detach_only else 'Dropped'} partition {name}")
+    return removed
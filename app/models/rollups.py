@@ -0,0 +1,200 @@
+"""
+Precomputed statistics rollups for the stats endpoints
+
+Counts are recomputed set-based (one GROUP BY per dimension) inside a single
+transaction, so readers always see a complete rollup.
+"""
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, func, insert, literal, select, update
+
+from app.models.database import Company, Contact, MonthlyData, StatRollup
+from app.models.versions import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+# Grouped dimensions per entity (dimension name -> column)
+ROLLUP_DIMENSIONS = {
+    'companies': {
+        'industry': Company.industry,
+        'location': Company.location,
+        'category': Company.category,
+        'source': Company.source,
+    },
+    'contacts': {
+        'title': Contact.title,
+        'department': Contact.department,
+    },
+}
+
+# Ungrouped counts per entity (dimension name -> column that must be set, None for all rows)
+ROLLUP_TOTALS = {
+    'companies': {'total': None},
+    'contacts': {'total': None, 'with_phone': Contact.phone},
+}
+
+ENTITY_MODELS = {'companies': Company, 'contacts': Contact}
+
+
+def _insert_rows(conn, rows):
+    """Insert (entity, dimension, value, count) rows with one refresh timestamp"""
+    if rows:
+        conn.execute(insert(StatRollup), rows)
+
+
+def _refresh_dimension(conn, entity, dimension, column, refreshed_at):
+    """Replace the rollup rows of one grouped dimension"""
+    conn.execute(delete(StatRollup).where(
+        StatRollup.entity == entity, StatRollup.dimension == dimension
+    ))
+    value = func.substr(column, 1, 255)
+    conn.execute(insert(StatRollup).from_select(
+        ['entity', 'dimension', 'value', 'count', 'refreshed_at'],
+        select(literal(entity), literal(dimension), value, func.count(), literal(refreshed_at))
+        .where(column.isnot(None), column != '')
+        .group_by(value)
+    ))
+
+
+def _refresh_months(conn, month_keys, refreshed_at):
+    """Replace the per-month company counts (all months, or only month_keys)"""
+    condition = [StatRollup.entity == 'companies', StatRollup.dimension == 'month']
+    if month_keys is not None:
+        condition.append(StatRollup.value.in_(month_keys))
+    conn.execute(delete(StatRollup).where(*condition))
+
+    source = select(
+        literal('companies'), literal('month'), MonthlyData.month_key,
+        func.count(func.distinct(MonthlyData.company_id)), literal(refreshed_at)
+    ).where(MonthlyData.data_type == 'company')
+    if month_keys is not None:
+        source = source.where(MonthlyData.month_key.in_(month_keys))
+    conn.execute(insert(StatRollup).from_select(
+        ['entity', 'dimension', 'value', 'count', 'refreshed_at'],
+        source.group_by(MonthlyData.month_key)
+    ))
+
+
+def refresh_rollups(conn, entities=None, month_keys=None):
+    """Recompute rollups for the given entities (default: all)
+
+    month_keys limits the per-month company counts to the months that
+    changed; None recomputes every month (e.g. after a retention purge).
+    """
+    entities = list(entities) if entities is not None else list(ROLLUP_DIMENSIONS)
+    refreshed_at = datetime.now(timezone.utc)
+
+    # Bump first: the counter row lock serializes concurrent refreshes of the same rows
+    bump_data_version(conn)
+
+    for entity in entities:
+        model = ENTITY_MODELS[entity]
+        for dimension, column in ROLLUP_TOTALS[entity].items():
+            count_query = select(func.count()).select_from(model)
+            if column is not None:
+                count_query = count_query.where(column.isnot(None))
+            conn.execute(delete(StatRollup).where(
+                StatRollup.entity == entity, StatRollup.dimension == dimension
+            ))
+            _insert_rows(conn, [{
+                'entity': entity, 'dimension': dimension, 'value': '',
+                'count': conn.execute(count_query).scalar(), 'refreshed_at': refreshed_at
+            }])
+
+        for dimension, column in ROLLUP_DIMENSIONS[entity].items():
+            _refresh_dimension(conn, entity, dimension, column, refreshed_at)
+
+        if entity == 'companies' and (month_keys is None or month_keys):
+            _refresh_months(conn, month_keys, refreshed_at)
+
+    logger.info(f"Refreshed statistics rollups for: {', '.join(entities)}")
+
+
+def seed_rollups(conn):
+    """Compute the rollups of entities that were never refreshed (schema bootstrap)"""
+    seeded = set(conn.execute(select(StatRollup.entity).distinct()).scalars())
+    missing = [entity for entity in ROLLUP_DIMENSIONS if entity not in seeded]
+    if missing:
+        refresh_rollups(conn, missing)
+    return missing
+
+
+def refresh_after_write(session, entities, month_keys=()):
+    """Recompute the rollups of entities a bulk write touched, in the write's transaction
+
+    month_keys names the months whose company counts changed (company
+    deletes take their monthly data with them); other months are kept.
+    """
+    session.flush()
+    refresh_rollups(session.connection(), entities, sorted(month_keys))
+
+
+def rollup_snapshot(entity, obj):
+    """Rolled-up column values of an ORM object (take it before changing the object)"""
+    columns = list(ROLLUP_DIMENSIONS[entity].values()) + [
+        column for column in ROLLUP_TOTALS[entity].values() if column is not None
+    ]
+    return {column.key: getattr(obj, column.key) for column in columns}
+
+
+def _rollup_keys(entity, row):
+    """(dimension, value) rollup rows that count a row given as a rollup_snapshot()"""
+    keys = [
+        (dimension, '') for dimension, column in ROLLUP_TOTALS[entity].items()
+        if column is None or row[column.key] is not None
+    ]
+    for dimension, column in ROLLUP_DIMENSIONS[entity].items():
+        value = row[column.key]
+        if value is not None and value != '':
+            keys.append((dimension, str(value)[:255]))
+    return keys
+
+
+def apply_rollup_deltas(bind, entity, removed=(), added=(), removed_months=()):
+    """Adjust the rollup counts for single-row writes instead of recounting the table
+
+    removed and added are rollup_snapshot() values of the rows before and
+    after the write (an update passes both). removed_months are months a
+    deleted company was counted in. Call after bump_data_version, whose
+    row lock serializes writers.
+    """
+    deltas = Counter()
+    for row in removed:
+        deltas.subtract(_rollup_keys(entity, row))
+    for row in added:
+        deltas.update(_rollup_keys(entity, row))
+    deltas.subtract(('month', month_key) for month_key in removed_months)
+
+    for (dimension, value), delta in deltas.items():
+        if delta == 0:
+            continue
+        key = (StatRollup.entity == entity, StatRollup.dimension == dimension, StatRollup.value == value)
+        result = bind.execute(update(StatRollup).where(*key).values(count=StatRollup.count + delta))
+        if result.rowcount == 0 and delta > 0:
+            bind.execute(insert(StatRollup).values(entity=entity, dimension=dimension, value=value, count=delta))
+        elif dimension not in ROLLUP_TOTALS[entity]:
+            # Grouped values drop out at zero, as in a full refresh
+            bind.execute(delete(StatRollup).where(*key, StatRollup.count <= 0))
+
+
+def read_rollup(session, entity):
+    """Return {dimension: [(value, count), ...]} and the refresh timestamp for an entity (read-only)"""
+    rows = session.query(StatRollup).filter(StatRollup.entity == entity).all()
+
+    dimensions = {}
+    refreshed_at = None
+    for row in rows:
+        dimensions.setdefault(row.dimension, []).append((row.value, row.count))
+        if row.dimension == 'total':
+            refreshed_at = row.refreshed_at
+    for values in dimensions.values():
+        values.sort(key=lambda item: (-item[1], item[0]))
+    return dimensions, refreshed_at
+
+
+def rollup_total(dimensions, dimension='total'):
+    """Return an ungrouped count from read_rollup output"""
+    values = dimensions.get(dimension)
+    return values[0][1] if values else 0
@@ -1,7 +1,7 @@
 """
 Pydantic schemas for LeadTool API
 """
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 from typing import Optional, List
 from datetime import datetime
 
@@ -15,6 +15,14 @@ class CompanyBase(BaseModel):
     industry: Optional[str] = None
     size: Optional[str] = None
     location: Optional[str] = None
+    category: Optional[str] = None
+    address: Optional[str] = None
+    phone: Optional[str] = None
+    rating: Optional[float] = None
+    review_count: Optional[int] = None
+    source: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 
 class CompanyCreate(CompanyBase):
@@ -29,6 +37,14 @@ class CompanyUpdate(BaseModel):
     industry: Optional[str] = None
     size: Optional[str] = None
     location: Optional[str] = None
+    category: Optional[str] = None
+    address: Optional[str] = None
+    phone: Optional[str] = None
+    rating: Optional[float] = None
+    review_count: Optional[int] = None
+    source: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 
 class Company(CompanyBase):
@@ -108,12 +124,65 @@ class CompanyWithMonthlyData(Company):
     monthly_data: List[MonthlyData] = []
 
 
+class CompanyNearby(Company):
+    distance_km: float
+
+
+# Metric time series schemas
+class CompanyMetric(BaseModel):
+    month_key: str
+    rating: Optional[float] = None
+    review_count: Optional[int] = None
+    phone: Optional[str] = None
+    has_phone: bool = False
+    has_website: bool = False
+    has_address: bool = False
+    
+    class Config:
+        from_attributes = True
+
+
+class CompanyTrend(BaseModel):
+    company_id: int
+    name: str
+    from_value: Optional[float] = None
+    to_value: Optional[float] = None
+    change: Optional[float] = None
+
+
+# Cursor pagination envelopes
+class CompanyPage(BaseModel):
+    items: List[Company] = []
+    next_cursor: Optional[str] = None
+
+
+class ContactPage(BaseModel):
+    items: List[Contact] = []
+    next_cursor: Optional[str] = None
+
+
+# Batch multi-get requests
+BATCH_GET_MAX_IDS = 1000
+
+
+class BatchGetRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BATCH_GET_MAX_IDS)
+    fields: Optional[str] = None  # Comma-separated, as in the fields= query parameter
+
+
+class CompanyBatchGetRequest(BatchGetRequest):
+    include_contacts: bool = False
+
+
 # Filter and search schemas
 class CompanyFilter(BaseModel):
     name: Optional[str] = None
     domain: Optional[str] = None
     industry: Optional[str] = None
     location: Optional[str] = None
+    min_rating: Optional[float] = None
+    max_rating: Optional[float] = None
+    min_reviews: Optional[int] = None
     month_key: Optional[str] = None
 
 
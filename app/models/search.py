@@ -0,0 +1,224 @@
+"""
+Full-text and trigram search indexes for companies and contacts
+
+SQLite uses external-content FTS5 tables kept in sync by triggers,
+PostgreSQL uses GIN indexes over to_tsvector() expressions and pg_trgm.
+"""
+import logging
+import re
+
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+
+logger = logging.getLogger(__name__)
+
+# Searchable columns per table (order matters for the FTS5 column list)
+FULLTEXT_COLUMNS = {
+    'companies': ['name', 'domain', 'description', 'industry', 'location'],
+    'contacts': ['first_name', 'last_name', 'title', 'department'],
+}
+
+# Columns filtered by substring on list/export endpoints
+TRIGRAM_COLUMNS = {
+    'companies': ['name', 'domain', 'industry', 'location'],
+    'contacts': ['title', 'department'],
+}
+
+# Trigram indexes only help for patterns of at least three characters
+MIN_TRIGRAM_LENGTH = 3
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Tables whose full-text / trigram index was verified or created in this process
+_fulltext_ready = set()
+_trigram_ready = set()
+
+
+def tsvector_expression(table_name, qualified=False):
+    """SQL for the tsvector expression indexed on PostgreSQL"""
+    prefix = f"{table_name}." if qualified else ''
+    document = " || ' ' || ".join(
+        f"coalesce({prefix}{column}, '')" for column in FULLTEXT_COLUMNS[table_name]
+    )
+    return f"to_tsvector('simple', {document})"
+
+
+def _sqlite_fts_triggers(table_name, fts, columns):
+    """Triggers keeping an external-content FTS5 table in sync with its content table"""
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f"new.{column}" for column in columns)
+    old_values = ', '.join(f"old.{column}" for column in columns)
+    delete_old = (
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values});"
+
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column_list} ON {table_name} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def _sqlite_fts_ddl(table_name, fts, columns, tokenize):
+    """DDL statements for an external-content FTS5 table and its sync triggers"""
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({', '.join(columns)}, "
+        f"content='{table_name}', content_rowid='id', tokenize='{tokenize}')",
+        *_sqlite_fts_triggers(table_name, fts, columns),
+        # Index rows that existed before the FTS table
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _create_sqlite_fts(conn, table_name, fts, columns, tokenize):
+    """Create an FTS5 side table unless it already exists (restoring its triggers if it does)"""
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": fts}
+    ).first()
+    if not exists:
+        for statement in _sqlite_fts_ddl(table_name, fts, columns, tokenize):
+            conn.execute(text(statement))
+        logger.info(f"Created FTS5 table {fts}")
+    else:
+        # Rebuilding the content table (see migrations) drops its triggers; rowids are kept
+        for statement in _sqlite_fts_triggers(table_name, fts, columns):
+            conn.execute(text(statement))
+
+
+def ensure_fulltext_indexes(conn):
+    """Create full-text indexes for all searchable tables if missing"""
+    dialect = conn.dialect.name
+    for table_name in FULLTEXT_COLUMNS:
+        try:
+            if dialect == 'sqlite':
+                _create_sqlite_fts(
+                    conn, table_name, f"{table_name}_fts",
+                    FULLTEXT_COLUMNS[table_name], 'unicode61 remove_diacritics 2'
+                )
+            elif dialect == 'postgresql':
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table_name}_fulltext "
+                    f"ON {table_name} USING GIN ({tsvector_expression(table_name)})"
+                ))
+            else:
+                continue
+            _fulltext_ready.add(table_name)
+        except Exception as e:
+            # e.g. SQLite built without FTS5: searches fall back to ILIKE
+            logger.warning(f"Full-text index unavailable for {table_name}: {e}")
+
+
+def ensure_trigram_indexes(conn):
+    """Create trigram indexes for substring filters if missing"""
+    dialect = conn.dialect.name
+    for table_name, columns in TRIGRAM_COLUMNS.items():
+        try:
+            if dialect == 'sqlite':
+                # FTS5 trigram tables answer LIKE '%abc%' from an n-gram index
+                _create_sqlite_fts(conn, table_name, f"{table_name}_trgm", columns, 'trigram')
+            elif dialect == 'postgresql':
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                for column_name in columns:
+                    conn.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{column_name}_trgm "
+                        f"ON {table_name} USING GIN ({column_name} gin_trgm_ops)"
+                    ))
+            else:
+                continue
+            _trigram_ready.add(table_name)
+        except Exception as e:
+            # e.g. SQLite older than 3.34 or no CREATE privilege for pg_trgm
+            logger.warning(f"Trigram index unavailable for {table_name}: {e}")
+
+
+def text_match_mode(value):
+    """Pick exact, prefix or substring matching for a filter value
+
+    "value" (quoted) matches the whole value, value* matches as a prefix,
+    anything else matches as a substring; all three ignore case. Values shorter than three characters are
+    too short for trigrams and are matched without the index.
+    """
+    if len(value) >= 2 and value.startswith('"') and value.endswith('"'):
+        return 'exact', value[1:-1]
+    if value.endswith('*'):
+        return 'prefix', value.rstrip('*')
+    return 'substring', value
+
+
+def apply_text_filter(query, model, column_name, value, dialect):
+    """Filter an ORM query on a text column using the best available index"""
+    mode, term = text_match_mode(value)
+    column_attr = getattr(model, column_name)
+
+    if mode == 'exact':
+        # Case-insensitive like the other modes, served by the lower(column) index;
+        # both sides use SQL lower() so SQLite and PostgreSQL fold the same way
+        return query.filter(func.lower(column_attr) == func.lower(term))
+
+    pattern = f"{term}%" if mode == 'prefix' else f"%{term}%"
+    table_name = model.__tablename__
+    indexed = (
+        table_name in _trigram_ready
+        and column_name in TRIGRAM_COLUMNS.get(table_name, [])
+        and len(term) >= MIN_TRIGRAM_LENGTH
+    )
+
+    if indexed and dialect == 'sqlite':
+        trgm = table(f"{table_name}_trgm", column('rowid'), column(column_name))
+        return query.filter(model.id.in_(
+            select(trgm.c.rowid).where(trgm.c[column_name].like(pattern))
+        ))
+
+    # PostgreSQL: ILIKE is served by the pg_trgm GIN index when present
+    return query.filter(column_attr.ilike(pattern))
+
+
+def apply_rating_filters(query, model, min_rating=None, max_rating=None, min_reviews=None):
+    """Apply numeric rating / review count ranges (served by the (rating, id) and (review_count, id) indexes)"""
+    if min_rating is not None:
+        query = query.filter(model.rating >= min_rating)
+    if max_rating is not None:
+        query = query.filter(model.rating <= max_rating)
+    if min_reviews is not None:
+        query = query.filter(model.review_count >= min_reviews)
+    return query
+
+
+def _search_terms(q):
+    """Split a user query into word tokens"""
+    return TOKEN_RE.findall(q)
+
+
+def apply_fulltext_search(query, model, q, dialect, ranked=True):
+    """Filter (and optionally rank) an ORM query by a full-text search for q
+
+    Every word must match as a word prefix ("pizz" finds "pizzeria").
+    Falls back to ILIKE on each searchable column when no full-text
+    index is available.
+    """
+    table_name = model.__tablename__
+    terms = _search_terms(q)
+
+    if table_name in _fulltext_ready and terms and dialect == 'sqlite':
+        fts = literal_column(f"{table_name}_fts")
+        fts_table = table(f"{table_name}_fts", column('rowid'))
+        match = ' '.join(f'"{term}"*' for term in terms)
+        query = query.join(fts_table, fts_table.c.rowid == model.id).filter(fts.op('MATCH')(match))
+        if ranked:
+            query = query.order_by(func.bm25(fts))
+        return query
+
+    if table_name in _fulltext_ready and terms and dialect == 'postgresql':
+        vector = literal_column(tsvector_expression(table_name, qualified=True))
+        tsquery = func.to_tsquery('simple', ' & '.join(f"{term}:*" for term in terms))
+        query = query.filter(vector.op('@@')(tsquery))
+        if ranked:
+            query = query.order_by(func.ts_rank(vector, tsquery).desc())
+        return query
+
+    return query.filter(or_(*[
+        getattr(model, column_name).ilike(f"%{q}%") for column_name in FULLTEXT_COLUMNS[table_name]
+    ]))
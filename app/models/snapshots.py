@@ -0,0 +1,91 @@
+"""
+Active snapshot pointers for monthly data
+
+Each search query has one row in active_snapshots naming the month whose
+MonthlyData rows are currently published. Publishing a new month only
+rewrites these pointer rows, so the switch is atomic and costs O(queries)
+instead of rewriting every MonthlyData row's is_active flag.
+"""
+import logging
+
+from sqlalchemy import and_, exists, func, insert, literal, select
+
+from app.models.database import ActiveSnapshot, Company, MonthlyData
+from app.models.versions import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+
+def active_snapshot_condition():
+    """Join condition matching MonthlyData rows to their published snapshot"""
+    return and_(
+        ActiveSnapshot.query_name == MonthlyData.query_name,
+        ActiveSnapshot.month_key == MonthlyData.month_key
+    )
+
+
+def is_published():
+    """EXISTS clause: the MonthlyData row belongs to its query's published snapshot"""
+    return exists().where(active_snapshot_condition())
+
+
+def active_month_exists(month_key):
+    """EXISTS clause: the company has a row in the published snapshot for month_key
+
+    A semi-join returns each company once however many queries found it.
+    Each probe reads only the (company_id, month_key, data_type, query_name)
+    index; SELECT 1 rather than SELECT * keeps SQLite from visiting the table.
+    """
+    return select(literal(1)).where(
+        MonthlyData.company_id == Company.id,
+        MonthlyData.month_key == month_key,
+        ActiveSnapshot.query_name == MonthlyData.query_name,
+        ActiveSnapshot.month_key == month_key
+    ).exists()
+
+
+def filter_active_month(query, month_key):
+    """Restrict a Company query to companies in the published snapshot for month_key"""
+    return query.filter(active_month_exists(month_key))
+
+
+def get_published_months(session):
+    """Return {query_name: month_key} for all published snapshots"""
+    return dict(session.query(ActiveSnapshot.query_name, ActiveSnapshot.month_key).all())
+
+
+def publish_month(session, month_key):
+    """Point every query scraped in month_key at that month in one transaction"""
+    query_names = [
+        name for (name,) in session.query(MonthlyData.query_name).filter(
+            MonthlyData.month_key == month_key,
+            MonthlyData.query_name.isnot(None)
+        ).distinct()
+    ]
+    
+    for query_name in query_names:
+        session.merge(ActiveSnapshot(query_name=query_name, month_key=month_key))
+    
+    bump_data_version(session)
+    session.commit()
+    logger.info(f"Published {month_key} for {len(query_names)} queries")
+    return query_names
+
+
+def bootstrap_active_snapshots(conn):
+    """Seed pointers from legacy is_active flags when no snapshot exists yet"""
+    if conn.execute(select(ActiveSnapshot.query_name).limit(1)).first():
+        return 0
+    
+    rows = conn.execute(
+        select(MonthlyData.query_name, func.max(MonthlyData.month_key))
+        .where(MonthlyData.is_active == True, MonthlyData.query_name.isnot(None))
+        .group_by(MonthlyData.query_name)
+    ).all()
+    if rows:
+        conn.execute(insert(ActiveSnapshot), [
+            {"query_name": query_name, "month_key": month_key}
+            for query_name, month_key in rows
+        ])
+        logger.info(f"Seeded {len(rows)} active snapshots from is_active flags")
+    return len(rows)
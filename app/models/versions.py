@@ -0,0 +1,43 @@
+"""
+Data version counter for cache invalidation
+
+Writers bump the counter in the same transaction as their change; readers
+include the current version in cache keys, so stale entries are never hit.
+"""
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.database import DataVersion
+
+DEFAULT_VERSION = 'default'
+
+
+def _connection(bind):
+    """Accept a Session or a Connection"""
+    return bind.connection() if isinstance(bind, Session) else bind
+
+
+def ensure_data_version(conn, name=DEFAULT_VERSION):
+    """Create the counter row if it does not exist yet"""
+    if conn.execute(select(DataVersion.name).where(DataVersion.name == name)).first() is None:
+        conn.execute(insert(DataVersion).values(name=name, version=0))
+
+
+def get_data_version(bind, name=DEFAULT_VERSION):
+    """Return the current data version (0 if never bumped)"""
+    version = _connection(bind).execute(
+        select(DataVersion.version).where(DataVersion.name == name)
+    ).scalar()
+    return version or 0
+
+
+def bump_data_version(bind, name=DEFAULT_VERSION):
+    """Increment the data version inside the caller's transaction"""
+    conn = _connection(bind)
+    result = conn.execute(
+        update(DataVersion)
+        .where(DataVersion.name == name)
+        .values(version=DataVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        conn.execute(insert(DataVersion).values(name=name, version=1))
@@ -0,0 +1 @@
+# Request instrumentation for LeadTool
@@ -0,0 +1,262 @@
+"""
+Prometheus-style metrics for the API
+
+Counters, gauges and histograms live in an in-process registry and are
+rendered in the Prometheus text exposition format by GET /metrics. HTTP
+metrics come from an ASGI middleware, database metrics from SQLAlchemy
+Engine events; pool usage and cache hit rates are read at scrape time.
+Each process keeps its own registry, so scrape every worker.
+"""
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Latency buckets in seconds (Prometheus client defaults)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class: a named family of samples keyed by label values"""
+    type_name = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def samples(self):
+        """Snapshot of (label values, value) pairs, safe against concurrent updates"""
+        with self._lock:
+            return sorted((labels, list(value) if isinstance(value, list) else value) for labels, value in self._values.items())
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def set(self, *label_values, value):
+        """Overwrite a sample (gauges, or counters mirrored from elsewhere)"""
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self):
+        lines = self.header()
+        for label_values, value in self.samples():
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    type_name = 'gauge'
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *label_values, value):
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, +Inf last, then the sum
+                series = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = self.header()
+        for label_values, series in self.samples():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                labels = _format_labels(self.labels + ('le',), label_values + (_format_value(float(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metric families plus callbacks that refresh gauges at scrape time"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        for collector in self.collectors:
+            collector()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'leadtool_http_requests_total', 'HTTP requests by route and status', ('method', 'route', 'status')))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    'leadtool_http_request_duration_seconds', 'HTTP request latency (until the body is sent)', ('method', 'route')))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    'leadtool_http_requests_in_flight', 'HTTP requests being served'))
+HTTP_RESPONSE_BYTES = REGISTRY.register(Counter(
+    'leadtool_http_response_bytes_total', 'Response body bytes by route (export sizes included)', ('method', 'route')))
+DB_STATEMENTS = REGISTRY.register(Counter(
+    'leadtool_db_statements_total', 'SQL statements executed by type', ('operation',)))
+DB_LATENCY = REGISTRY.register(Histogram(
+    'leadtool_db_statement_duration_seconds', 'SQL statement execution time', ('operation',), DB_BUCKETS))
+DB_POOL = REGISTRY.register(Gauge(
+    'leadtool_db_pool_connections', 'Connection pool usage', ('state',)))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'leadtool_cache_lookups_total', 'Response cache lookups by result', ('result',)))
+CACHE_HIT_RATE = REGISTRY.register(Gauge(
+    'leadtool_cache_hit_ratio', 'Response cache hit rate since startup'))
+
+_listener_installed = False
+
+
+def _operation(statement):
+    """SELECT, INSERT, UPDATE, DELETE, ... (first keyword of the statement)"""
+    keyword = statement.lstrip()[:10].split(None, 1)
+    return keyword[0].upper() if keyword else 'OTHER'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None:
+        return
+    operation = _operation(statement)
+    DB_STATEMENTS.inc(operation)
+    DB_LATENCY.observe(operation, value=perf_counter() - started)
+
+
+def install_db_metrics():
+    """Time every statement on every engine (idempotent)"""
+    global _listener_installed
+    if not _listener_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listener_installed = True
+
+
+def pool_collector(get_engine):
+    """Scrape-time callback reporting pool usage of the engine returned by get_engine()"""
+    def collect():
+        pool = get_engine().pool
+        for state, method in (('checked_out', 'checkedout'), ('idle', 'checkedin'), ('overflow', 'overflow'), ('size', 'size')):
+            if hasattr(pool, method):
+                # QueuePool.overflow() is negative while the pool is not full
+                DB_POOL.set(state, value=max(getattr(pool, method)(), 0))
+    return collect
+
+
+def cache_collector(response_cache):
+    """Scrape-time callback copying the response cache counters"""
+    def collect():
+        stats = response_cache.stats()
+        for result in ('hits', 'misses', 'not_modified', 'bypassed'):
+            CACHE_LOOKUPS.set(result, value=stats[result])
+        CACHE_HIT_RATE.set(value=stats['hit_rate'])
+    return collect
+
+
+def route_label(scope):
+    """Route template including router prefixes, e.g. /api/v1/companies/{company_id}
+
+    Unmatched paths share one label so 404 scans cannot blow up cardinality.
+    Responses served by the cache carry the label stored with the entry.
+    """
+    if 'leadtool.route' in scope:
+        return scope['leadtool.route']
+    template = getattr(scope.get('route'), 'path', None)
+    if template is None:
+        return 'unmatched'
+    # Included routers report their own path; recover the prefix from the request path
+    parts = scope['path'].rstrip('/').split('/')
+    prefix = '/'.join(parts[:max(len(parts) - template.count('/'), 1)])
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency, in-flight requests and response bytes"""
+
+    def __init__(self, app, exclude_paths=('/metrics',)):
+        self.app = app
+        self.exclude_paths = tuple(exclude_paths)
+        install_db_metrics()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter()
+        status = 500
+        sent = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, sent
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                sent += len(message.get('body', b''))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            method = scope['method']
+            route = route_label(scope)
+            HTTP_REQUESTS.inc(method, route, str(status))
+            HTTP_LATENCY.observe(method, route, value=perf_counter() - started)
+            HTTP_RESPONSE_BYTES.inc(method, route, amount=sent)
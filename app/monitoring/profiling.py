@@ -0,0 +1,196 @@
+"""
+On-demand profiling of single API requests
+
+A request carrying the profiling token (X-Profile header or profile=
+query parameter) is sampled by a background thread that reads the
+serving thread's stack every few milliseconds. The samples are written
+to logs/profiles/ as folded stacks (flamegraph.pl, speedscope and
+inferno read them directly), next to a JSON file with the SQL statements
+the request ran and their timings. The middleware is only installed when
+profiling is enabled in settings.yaml; other requests pass straight
+through.
+
+Stack samples are process-wide for the serving thread: async handlers
+share the event loop, so frames of unprofiled requests served at the
+same time show up in the profile too (the SQL list is per request).
+Only one profiled request runs at a time; a second one gets 409.
+"""
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from time import perf_counter
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.path.join('logs', 'profiles')
+DEFAULT_INTERVAL = 0.002
+
+_current_profile = ContextVar('request_profile', default=None)
+_listener_installed = False
+
+
+class StackSampler(threading.Thread):
+    """Sample one thread's Python stack at a fixed interval into folded-stack counts"""
+
+    def __init__(self, thread_id, interval=DEFAULT_INTERVAL):
+        super().__init__(name='request-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[fold_stack(frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def fold_stack(frame):
+    """Root-first "file:function:line;..." string for a frame (line of the def)"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class RequestProfile:
+    """SQL statements run by one profiled request"""
+
+    def __init__(self):
+        self.statements = []
+
+    def record_statement(self, statement, seconds):
+        self.statements.append({"sql": ' '.join(statement.split()), "ms": round(seconds * 1000, 3)})
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None and context is not None:
+        context._profile_started = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    started = getattr(context, '_profile_started', None)
+    if profile is not None and started is not None:
+        profile.record_statement(statement, perf_counter() - started)
+
+
+def install_profile_listeners():
+    """Attach SQL timing to profiled requests (idempotent)"""
+    global _listener_installed
+    if not _listener_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listener_installed = True
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that present the profiling token
+
+    Responses of profiled requests carry X-Profile-Id, the base name of
+    the .folded and .json files written to output_dir. A profiled request
+    arriving while another is being profiled is rejected with 409, since
+    both samplers would record the same event-loop thread.
+    """
+
+    def __init__(self, app, token, output_dir=PROFILE_DIR, interval=DEFAULT_INTERVAL):
+        self.app = app
+        self.token = token
+        self.output_dir = output_dir
+        self.interval = interval
+        self.busy = threading.Lock()
+        install_profile_listeners()
+
+    def requested(self, scope):
+        """True when the request carries a valid profiling token"""
+        presented = None
+        for name, value in scope['headers']:
+            if name == b'x-profile':
+                presented = value.decode('latin-1')
+                break
+        if presented is None and b'profile=' in scope['query_string']:
+            presented = dict(parse_qsl(scope['query_string'].decode('latin-1'))).get('profile')
+        return presented is not None and hmac.compare_digest(presented, self.token)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not self.busy.acquire(blocking=False):
+            response = JSONResponse(status_code=409, content={"detail": "Another request is being profiled"})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.profile(scope, receive, send)
+        finally:
+            self.busy.release()
+
+    async def profile(self, scope, receive, send):
+        """Run the request under the stack sampler and write its profile"""
+        started_at = datetime.now()
+        profile_id = f"{started_at:%Y%m%d-%H%M%S-%f}_{scope['method']}_{re.sub(r'[^A-Za-z0-9]+', '-', scope['path']).strip('-')}"
+
+        async def send_with_id(message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', [])) + [(b'x-profile-id', profile_id.encode('latin-1'))]
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        sampler.start()
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = perf_counter() - started
+            sampler.stop()
+            _current_profile.reset(token)
+            self.write(profile_id, scope, started_at, elapsed, sampler.stacks, profile.statements)
+
+    def write(self, profile_id, scope, started_at, elapsed, stacks, statements):
+        """Write the folded stacks and the request/SQL summary"""
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            base = os.path.join(self.output_dir, profile_id)
+            with open(f"{base}.folded", 'w', encoding='utf-8') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            with open(f"{base}.json", 'w', encoding='utf-8') as f:
+                json.dump({
+                    "method": scope['method'],
+                    "path": scope['path'],
+                    "query_string": urlencode([
+                        (name, value) for name, value in parse_qsl(scope['query_string'].decode('latin-1'))
+                        if name != 'profile'
+                    ]),
+                    "started_at": started_at.isoformat(),
+                    "wall_ms": round(elapsed * 1000, 3),
+                    "samples": sum(stacks.values()),
+                    "sample_interval_ms": self.interval * 1000,
+                    "sql_ms": round(sum(s["ms"] for s in statements), 3),
+                    "statements": statements,
+                }, f, indent=2)
+            logger.info(f"Profiled {scope['method']} {scope['path']} in {elapsed * 1000:.1f}ms -> {base}.folded")
+        except OSError as e:
+            logger.error(f"Failed to write request profile {profile_id}: {e}")
@@ -0,0 +1,142 @@
+"""
+Per-request SQL statement counting and query budgets
+
+A listener on the SQLAlchemy Engine class counts every statement executed
+while a request (or a count_queries() block) is active. Requests that run
+more statements than their route's budget are logged with the statements
+they issued, which is how N+1 relationship loads show up; in "raise" mode
+the request fails instead, so tests catch regressions.
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import compile_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY_BUDGET = 20
+
+# Statements kept per request for the budget warning
+MAX_RECORDED_STATEMENTS = 50
+
+_current_counter = ContextVar('query_counter', default=None)
+_listener_installed = False
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in "raise" mode when a request runs more statements than its budget"""
+
+
+class QueryCounter:
+    """Statements executed inside one request or count_queries() block"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def record(self, statement):
+        self.count += 1
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append(' '.join(statement.split()))
+
+    def repeated(self, top=3):
+        """Most repeated statements (the usual N+1 signature)"""
+        counts = {}
+        for statement in self.statements:
+            counts[statement] = counts.get(statement, 0) + 1
+        return sorted(((n, s) for s, n in counts.items() if n > 1), reverse=True)[:top]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.record(statement)
+
+
+def install_query_listener():
+    """Count statements on every engine (idempotent)"""
+    global _listener_installed
+    if not _listener_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        _listener_installed = True
+
+
+@contextmanager
+def count_queries():
+    """Count statements executed inside the block (e.g. in tests)
+
+        with count_queries() as counter:
+            client.get('/api/v1/export/combined')
+        assert counter.count <= 3
+    """
+    install_query_listener()
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+class QueryBudgetMiddleware:
+    """ASGI middleware enforcing per-route statement budgets (development mode)
+
+    budgets maps route templates, optionally prefixed with a method (e.g.
+    "GET /api/v1/companies/{company_id:int}"), to their budget; the first
+    match wins and other routes get default_budget. mode is "warn" (log)
+    or "raise" (raise QueryBudgetExceeded). Responses carry X-Query-Count.
+    """
+
+    def __init__(self, app, default_budget=DEFAULT_QUERY_BUDGET, budgets=None, mode='warn'):
+        self.app = app
+        self.default_budget = default_budget
+        self.budgets = [self._compile(route, budget) for route, budget in (budgets or {}).items()]
+        self.mode = mode
+        install_query_listener()
+
+    @staticmethod
+    def _compile(route, budget):
+        """Split "METHOD /template" and compile the template like Starlette routes"""
+        method, _, template = route.rpartition(' ')
+        return method.upper() or None, compile_path(template)[0], template, budget
+
+    def route_budget(self, method, path):
+        """Return (route template or path, budget) for a request"""
+        for route_method, regex, template, budget in self.budgets:
+            if route_method in (None, method) and regex.match(path):
+                return template, budget
+        return path, self.default_budget
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        counter = QueryCounter()
+        token = _current_counter.set(counter)
+
+        async def send_with_count(message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                headers.append((b'x-query-count', str(counter.count).encode('latin-1')))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            _current_counter.reset(token)
+
+        path, budget = self.route_budget(scope['method'], scope['path'])
+        if counter.count > budget:
+            repeated = '; '.join(f"{n}x {statement[:200]}" for n, statement in counter.repeated())
+            message = (
+                f"{scope['method']} {path} ran {counter.count} SQL statements "
+                f"(budget {budget}). Repeated: {repeated or 'none'}"
+            )
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
@@ -0,0 +1,229 @@
+"""
+Slow-query log with captured EXPLAIN plans
+
+Statements running longer than the threshold are written as JSON lines
+to a rotating log file and aggregated in memory per statement for the
+/admin/slow-queries endpoint. Each record carries the SQL, the shape of
+the bound parameters (types only, never values), where the statement
+came from (API route or scheduler/pipeline stage) and the plan:
+EXPLAIN QUERY PLAN on SQLite, EXPLAIN (optionally EXPLAIN ANALYZE for
+SELECTs) on PostgreSQL. Off by default (slow_queries.enabled).
+"""
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.monitoring.metrics import route_label
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_LOG = os.path.join('logs', 'slow_queries.log')
+
+# Distinct statements kept for the admin endpoint (least total time evicted first)
+MAX_TRACKED_STATEMENTS = 500
+
+# Only plain DML/queries are explained; DDL, PRAGMA, SAVEPOINT etc. are logged without a plan
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+EXPLAIN_SAVEPOINT = 'leadtool_explain'
+
+_current_source = ContextVar('query_source', default=None)
+_recorder = None
+
+
+@contextmanager
+def query_source(name):
+    """Attribute statements run inside the block (or decorated function) to name"""
+    token = _current_source.set(name)
+    try:
+        yield
+    finally:
+        _current_source.reset(token)
+
+
+def describe_source():
+    """Calling route or stage of the current statement"""
+    source = _current_source.get()
+    if isinstance(source, dict):
+        # An ASGI scope set by SlowQuerySourceMiddleware; the router fills in the route
+        routed = 'route' in source or 'leadtool.route' in source
+        return f"{source['method']} {route_label(source) if routed else source['path']}"
+    return source or 'unknown'
+
+
+def parameter_shape(parameters, executemany=False):
+    """Types of the bound parameters, e.g. ["int", "str"] or {"name": "str"}"""
+    if executemany:
+        rows = list(parameters or [])
+        if rows and not isinstance(rows[0], (dict, list, tuple)):
+            # insertmanyvalues batch: one multi-row VALUES statement with flattened parameters
+            return {"values": len(rows)}
+        return {"rows": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class SlowQueryRecorder:
+    """Engine-wide listener logging and aggregating statements over threshold_ms"""
+
+    def __init__(self, threshold_ms=200, log_path=SLOW_QUERY_LOG, max_bytes=10 * 1024 * 1024,
+                 backup_count=5, explain=True, explain_analyze=False):
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.explain_analyze = explain_analyze
+        self.stats = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(log_path) or '.', exist_ok=True)
+        self.log = logging.getLogger('leadtool.slow_queries')
+        self.log.propagate = False
+        self.log.setLevel(logging.INFO)
+        if not self.log.handlers:
+            self.log.addHandler(RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'))
+
+    def install(self):
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_started = perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_slow_query_started', None)
+        if started is None:
+            return
+        elapsed = perf_counter() - started
+        if elapsed >= self.threshold:
+            try:
+                self.record(conn, cursor, statement, parameters, executemany, elapsed)
+            except Exception as e:
+                logger.error(f"Failed to record slow query: {e}")
+
+    def explain_plan(self, conn, cursor, statement, parameters, executemany):
+        """Dialect-specific plan for a statement, or None"""
+        if not self.explain or executemany:
+            return None
+        words = statement.lstrip().split(None, 1)
+        keyword = words[0].upper() if words else ''
+        if keyword not in EXPLAINABLE:
+            return None
+        dialect = conn.dialect.name
+        if dialect == 'sqlite':
+            prefix = 'EXPLAIN QUERY PLAN '
+        elif dialect == 'postgresql':
+            # ANALYZE executes the statement again (a WITH may hide a write), so plain SELECTs only
+            prefix = 'EXPLAIN ANALYZE ' if self.explain_analyze and keyword == 'SELECT' else 'EXPLAIN '
+        else:
+            return None
+
+        # A separate DBAPI cursor, so the caller's pending result is untouched, and a
+        # savepoint, so a failed EXPLAIN does not abort the caller's transaction
+        explain_cursor = cursor.connection.cursor()
+        try:
+            explain_cursor.execute(f'SAVEPOINT {EXPLAIN_SAVEPOINT}')
+            try:
+                explain_cursor.execute(prefix + statement, parameters)
+                rows = explain_cursor.fetchall()
+            except Exception as e:
+                return f"EXPLAIN failed: {e}"
+            finally:
+                explain_cursor.execute(f'ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}')
+                explain_cursor.execute(f'RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}')
+        finally:
+            explain_cursor.close()
+        if dialect == 'sqlite':
+            # (id, parent, notused, detail)
+            return '\n'.join(row[-1] for row in rows)
+        return '\n'.join(row[0] for row in rows)
+
+    def record(self, conn, cursor, statement, parameters, executemany, elapsed):
+        """Log one slow statement and add it to the per-statement totals"""
+        sql = ' '.join(statement.split())
+        elapsed_ms = round(elapsed * 1000, 3)
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "ms": elapsed_ms,
+            "source": describe_source(),
+            "sql": sql,
+            "params": parameter_shape(parameters, executemany),
+            "plan": self.explain_plan(conn, cursor, statement, parameters, executemany),
+        }
+        self.log.info(json.dumps(entry, default=str))
+
+        with self._lock:
+            stats = self.stats.get(sql)
+            if stats is None:
+                if len(self.stats) >= MAX_TRACKED_STATEMENTS:
+                    del self.stats[min(self.stats, key=lambda key: self.stats[key]["total_ms"])]
+                stats = self.stats[sql] = {"sql": sql, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "sources": {}}
+            stats["count"] += 1
+            stats["total_ms"] = round(stats["total_ms"] + elapsed_ms, 3)
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["sources"][entry["source"]] = stats["sources"].get(entry["source"], 0) + 1
+            stats["last_params"] = entry["params"]
+            stats["last_plan"] = entry["plan"]
+            stats["last_at"] = entry["at"]
+
+    def top(self, limit=20):
+        """Slow statements ordered by total time"""
+        with self._lock:
+            ranked = sorted(self.stats.values(), key=lambda stats: stats["total_ms"], reverse=True)[:limit]
+            return [
+                dict(stats, sources=dict(stats["sources"]), avg_ms=round(stats["total_ms"] / stats["count"], 3))
+                for stats in ranked
+            ]
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+
+def install_slow_query_recorder(config):
+    """Install the recorder from the settings.yaml slow_queries section (once per process)"""
+    global _recorder
+    if _recorder is None and config.get('enabled', False):
+        _recorder = SlowQueryRecorder(
+            threshold_ms=config.get('threshold_ms', 200),
+            log_path=config.get('log_file', SLOW_QUERY_LOG),
+            max_bytes=config.get('max_bytes', 10 * 1024 * 1024),
+            backup_count=config.get('backup_count', 5),
+            explain=config.get('explain', True),
+            explain_analyze=config.get('explain_analyze', False),
+        )
+        _recorder.install()
+        logger.info(f"Slow-query log enabled (threshold {config.get('threshold_ms', 200)}ms)")
+    return _recorder
+
+
+def get_recorder():
+    """The installed recorder, or None when the slow-query log is disabled"""
+    return _recorder
+
+
+class SlowQuerySourceMiddleware:
+    """ASGI middleware attributing statements to the request's route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        token = _current_source.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_source.reset(token)
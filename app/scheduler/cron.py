@@ -7,13 +7,20 @@ import logging
 from datetime import datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 import subprocess
 import yaml
 
 # Add the project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from app.models.database import get_db, Company, MonthlyData
+from app.config import load_config
+from app.models.database import get_db, get_engine, init_db, run_sqlite_maintenance, Company, MonthlyData
+from app.models.snapshots import publish_month
+from app.models.rollups import refresh_rollups
+from app.models.partitions import ensure_upcoming_partitions
+from app.monitoring.slow_queries import install_slow_query_recorder, query_source
+from app.scheduler.retention import RetentionJob, ARCHIVE_DIR
 from app.scraper.spider import GoogleMapsSpider
 from scrapy.crawler import CrawlerProcess
 from scrapy.utils.project import get_project_settings
@@ -34,6 +41,7 @@ class LeadToolScheduler:
     
     def __init__(self):
         self.scheduler = BackgroundScheduler()
+        install_slow_query_recorder(load_config('settings').get('slow_queries') or {})
         self.setup_scheduler()
     
     def setup_scheduler(self):
@@ -56,6 +64,29 @@ class LeadToolScheduler:
             replace_existing=True
         )
         
+        # Create next month's monthly_data partition ahead of the 1st (PostgreSQL)
+        if get_engine().dialect.name == 'postgresql':
+            self.scheduler.add_job(
+                func=self.prepare_partitions,
+                trigger=CronTrigger(day=25, hour=0, minute=0),
+                id='monthly_partitions',
+                name='Monthly Data Partitions',
+                replace_existing=True
+            )
+        
+        # Periodic SQLite maintenance (PRAGMA optimize + WAL checkpoint)
+        if get_engine().dialect.name == 'sqlite':
+            interval_hours = (load_config('database').get('sqlite') or {}).get(
+                'maintenance_interval_hours', 6
+            )
+            self.scheduler.add_job(
+                func=self.run_database_maintenance,
+                trigger=IntervalTrigger(hours=interval_hours),
+                id='database_maintenance',
+                name='SQLite Maintenance',
+                replace_existing=True
+            )
+        
         logger.info("Scheduler configured for monthly scraping")
     
     def run_monthly_scraping(self):
@@ -67,36 +98,39 @@ class LeadToolScheduler:
             month_key = datetime.now().strftime("%Y-%m")
             logger.info(f"Processing month: {month_key}")
             
-            # Deactivate previous month's data
-            self.deactivate_previous_data(month_key)
+            # Make sure this month's partition exists before writing to it
+            self.prepare_partitions(month_key)
             
-            # Run the scraper
+            # Run the scraper (the previous month stays visible meanwhile)
             self.run_scraper()
             
+            # Make the new month visible in one pointer switch
+            self.publish_snapshot(month_key)
+            
             # Clean up old data (keep last 12 months)
             self.cleanup_old_data()
             
+            # Recompute the stats rollups (purged months drop out)
+            self.refresh_statistics()
+            
+            # Refresh planner statistics after the bulk load
+            self.run_database_maintenance()
+            
             logger.info("Monthly scraping process completed successfully")
             
         except Exception as e:
             logger.error(f"Error in monthly scraping process: {e}")
             # Send notification email or alert here if needed
     
-    def deactivate_previous_data(self, current_month_key):
-        """Deactivate data from previous months"""
+    @query_source('scheduler.publish_snapshot')
+    def publish_snapshot(self, month_key):
+        """Atomically switch the published month to month_key"""
         try:
             db = next(get_db())
-            
-            # Deactivate all active monthly data
-            db.query(MonthlyData).filter(
-                MonthlyData.is_active == True
-            ).update({"is_active": False})
-            
-            db.commit()
-            logger.info("Deactivated previous month's data")
-            
+            publish_month(db, month_key)
         except Exception as e:
-            logger.error(f"Error deactivating previous data: {e}")
+            logger.error(f"Error publishing month {month_key}: {e}")
+            raise
         finally:
             db.close()
     
@@ -125,34 +159,65 @@ class LeadToolScheduler:
             logger.error(f"Error running scraper: {e}")
             raise
     
+    @query_source('scheduler.cleanup_old_data')
     def cleanup_old_data(self):
-        """Clean up data older than 12 months"""
+        """Archive and purge monthly data older than the retention window"""
         try:
-            db = next(get_db())
-            
-            # Calculate cutoff date (12 months ago)
-            cutoff_date = datetime.now() - timedelta(days=365)
-            cutoff_month = cutoff_date.strftime("%Y-%m")
-            
-            # Delete old monthly data
-            old_data = db.query(MonthlyData).filter(
-                MonthlyData.month_key < cutoff_month
-            ).all()
+            scheduler_config = load_config('settings').get('scheduler') or {}
+            retention_months = scheduler_config.get('data_retention_months', 12)
             
-            for data in old_data:
-                db.delete(data)
+            # Calculate cutoff month (default 12 months ago)
+            now = datetime.now()
+            months = now.year * 12 + now.month - 1 - retention_months
+            cutoff_month = f"{months // 12}-{months % 12 + 1:02d}"
             
-            db.commit()
-            logger.info(f"Cleaned up data older than {cutoff_month}")
+            job = RetentionJob(
+                get_engine(),
+                cutoff_month,
+                batch_size=scheduler_config.get('retention_batch_size', 5000),
+                archive_dir=scheduler_config.get('archive_dir', ARCHIVE_DIR)
+            )
+            result = job.run()
+            logger.info(
+                f"Cleaned up data older than {cutoff_month}: {result['rows']} rows "
+                f"archived ({result['rows_per_sec']:.0f} rows/sec)"
+            )
             
         except Exception as e:
             logger.error(f"Error cleaning up old data: {e}")
-        finally:
-            db.close()
+    
+    @query_source('scheduler.refresh_statistics')
+    def refresh_statistics(self):
+        """Recompute the precomputed statistics rollups"""
+        try:
+            with get_engine().begin() as conn:
+                refresh_rollups(conn)
+        except Exception as e:
+            logger.error(f"Error refreshing statistics rollups: {e}")
+    
+    @query_source('scheduler.prepare_partitions')
+    def prepare_partitions(self, month_key=None):
+        """Create monthly_data partitions for this month and the next one"""
+        try:
+            with get_engine().begin() as conn:
+                created = ensure_upcoming_partitions(conn, month_key)
+            if created:
+                logger.info(f"Ensured monthly_data partitions for: {', '.join(created)}")
+        except Exception as e:
+            logger.error(f"Error preparing monthly_data partitions: {e}")
+    
+    @query_source('scheduler.run_database_maintenance')
+    def run_database_maintenance(self):
+        """Run periodic database maintenance"""
+        try:
+            run_sqlite_maintenance(get_engine())
+        except Exception as e:
+            logger.error(f"Error running database maintenance: {e}")
     
     def start(self):
         """Start the scheduler"""
         try:
+            init_db()
             self.scheduler.start()
             logger.info("Scheduler started successfully")
         except Exception as e:
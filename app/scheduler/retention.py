@@ -0,0 +1,156 @@
+"""
+Chunked retention purge for monthly data with archiving
+"""
+import gzip
+import json
+import logging
+import os
+import time
+
+from sqlalchemy import delete, select
+
+from app.models.database import MonthlyData
+from app.models.partitions import drop_partitions_before, is_partitioned, list_month_partitions
+from app.models.versions import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.path.join('data', 'archive')
+DEFAULT_BATCH_SIZE = 5000
+
+
+class RetentionJob:
+    """Archive and purge MonthlyData rows older than a cutoff month in primary-key batches
+
+    Each batch is written to a gzipped JSONL file under the archive directory
+    before it is deleted, and the last purged id is checkpointed to a state
+    file, so an interrupted run can simply be started again.
+    """
+
+    def __init__(self, engine, cutoff_month, batch_size=DEFAULT_BATCH_SIZE, archive_dir=ARCHIVE_DIR):
+        self.engine = engine
+        self.cutoff_month = cutoff_month
+        self.batch_size = batch_size
+        self.archive_dir = archive_dir
+        self.state_path = os.path.join(archive_dir, f"retention_{cutoff_month}.state.json")
+
+    def load_state(self):
+        """Return the last purged id from an interrupted run (0 if none)"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('last_id', 0)
+        except FileNotFoundError:
+            return 0
+
+    def save_state(self, last_id):
+        """Checkpoint the last purged id"""
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'cutoff_month': self.cutoff_month, 'last_id': last_id}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def write_archive(self, label, rows):
+        """Write a batch of rows to a gzipped JSONL archive file (atomically)"""
+        path = os.path.join(
+            self.archive_dir,
+            f"monthly_data_{label}_{rows[0]['id']}-{rows[-1]['id']}.jsonl.gz"
+        )
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(dict(row), default=str))
+                f.write('\n')
+        os.replace(tmp_path, path)
+        return path
+
+    def fetch_batch(self, conn, condition, last_id):
+        """Fetch the next batch of rows matching condition in primary-key order"""
+        return conn.execute(
+            select(MonthlyData.__table__)
+            .where(condition, MonthlyData.id > last_id)
+            .order_by(MonthlyData.id)
+            .limit(self.batch_size)
+        ).mappings().all()
+
+    def run(self):
+        """Archive and purge all expired rows, returning throughput statistics"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        started = time.monotonic()
+
+        with self.engine.connect() as conn:
+            partitioned = is_partitioned(conn)
+
+        if partitioned:
+            total = self.purge_partitions()
+        else:
+            total = self.purge_rows()
+
+        if total:
+            with self.engine.begin() as conn:
+                bump_data_version(conn)
+        
+        elapsed = time.monotonic() - started
+        rows_per_sec = total / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Retention purge before {self.cutoff_month}: {total} rows "
+            f"in {elapsed:.1f}s ({rows_per_sec:.0f} rows/sec)"
+        )
+
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return {"rows": total, "seconds": elapsed, "rows_per_sec": rows_per_sec}
+
+    def purge_rows(self):
+        """Archive then delete expired rows with set-based DELETEs, one batch per transaction"""
+        condition = MonthlyData.month_key < self.cutoff_month
+        last_id = self.load_state()
+        total = 0
+
+        while True:
+            with self.engine.begin() as conn:
+                rows = self.fetch_batch(conn, condition, last_id)
+                if not rows:
+                    break
+
+                first_id, batch_last_id = rows[0]['id'], rows[-1]['id']
+                self.write_archive(f"before_{self.cutoff_month}", rows)
+                conn.execute(
+                    delete(MonthlyData).where(
+                        MonthlyData.id.between(first_id, batch_last_id),
+                        condition
+                    )
+                )
+
+            last_id = batch_last_id
+            self.save_state(last_id)
+            total += len(rows)
+            logger.info(f"Purged {total} expired monthly_data rows (last id {last_id})")
+
+        return total
+
+    def purge_partitions(self):
+        """Archive expired partitions in batches, then drop them (PostgreSQL)"""
+        total = 0
+        with self.engine.connect() as conn:
+            expired = sorted(
+                month_key for month_key in list_month_partitions(conn)
+                if month_key < self.cutoff_month
+            )
+
+        for month_key in expired:
+            condition = MonthlyData.month_key == month_key
+            last_id = 0
+            with self.engine.connect() as conn:
+                while True:
+                    rows = self.fetch_batch(conn, condition, last_id)
+                    if not rows:
+                        break
+                    self.write_archive(month_key, rows)
+                    last_id = rows[-1]['id']
+                    total += len(rows)
+                conn.rollback()
+            logger.info(f"Archived partition for {month_key}")
+
+        with self.engine.begin() as conn:
+            drop_partitions_before(conn, self.cutoff_month)
+        return total
@@ -4,7 +4,14 @@ Scrapy pipelines for LeadTool data processing
 import json
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine, func
-from app.models.database import Company, Contact, MonthlyData, Base
+from app.models.changes import record_changes
+from app.models.database import Company, Contact, MonthlyData, configure_engine, create_schema
+from app.models.metrics import record_company_metric
+from app.models.partitions import ensure_upcoming_partitions
+from app.models.rollups import refresh_rollups
+from app.models.versions import bump_data_version
+from app.monitoring.slow_queries import install_slow_query_recorder, query_source
+from app.config import load_config
 from app.models.schemas import CompanyCreate, ContactCreate
 import logging
 
@@ -17,6 +24,9 @@ class DatabasePipeline:
     def __init__(self):
         self.engine = None
         self.Session = None
+        # Entities and months written during this crawl (for the stats rollup refresh)
+        self.touched_entities = set()
+        self.touched_months = set()
     
     def open_spider(self, spider):
         """Initialize database connection when spider opens"""
@@ -25,11 +35,18 @@ class DatabasePipeline:
             database_url = spider.settings.get('DATABASE_URL', 'sqlite:///./data/leadtool.db')
             
             # Create engine and session
-            self.engine = create_engine(database_url)
+            self.engine = configure_engine(create_engine(database_url))
             self.Session = sessionmaker(bind=self.engine)
             
+            # Log slow statements of this crawl when the slow-query log is enabled
+            install_slow_query_recorder(load_config('settings').get('slow_queries') or {})
+            
             # Create tables if they don't exist
-            Base.metadata.create_all(bind=self.engine)
+            create_schema(self.engine)
+            
+            # Make sure this run's month has a partition (PostgreSQL only)
+            with self.engine.begin() as conn:
+                ensure_upcoming_partitions(conn, getattr(spider, 'month_key', None), months_ahead=0)
             
             logger.info(f"Database pipeline initialized with URL: {database_url}")
         except Exception as e:
@@ -38,6 +55,13 @@ class DatabasePipeline:
     
     def close_spider(self, spider):
         """Clean up database connection when spider closes"""
+        if self.engine and self.touched_entities:
+            try:
+                with self.engine.begin() as conn:
+                    refresh_rollups(conn, sorted(self.touched_entities), sorted(self.touched_months))
+            except Exception as e:
+                logger.error(f"Error refreshing statistics rollups: {e}")
+        
         if self.engine:
             self.engine.dispose()
             logger.info("Database pipeline closed")
@@ -47,14 +71,23 @@ class DatabasePipeline:
         try:
             session = self.Session()
             
-            if item['type'] == 'company':
-                self.process_company_item(item, session)
-            elif item['type'] == 'contact':
-                self.process_contact_item(item, session)
-            
-            session.commit()
+            # Invalidate cached API responses in the same transaction (bumped
+            # first so change log ids follow commit order)
+            bump_data_version(session)
+            
+            with query_source(f"pipeline.{item['type']}"):
+                if item['type'] == 'company':
+                    self.process_company_item(item, session)
+                elif item['type'] == 'contact':
+                    self.process_contact_item(item, session)
+                
+                session.commit()
             session.close()
             
+            self.touched_entities.add('companies' if item['type'] == 'company' else 'contacts')
+            if item['type'] == 'company':
+                self.touched_months.add(item['month_key'])
+            
         except Exception as e:
             logger.error(f"Error processing item: {e}")
             if 'session' in locals():
@@ -90,12 +123,16 @@ class DatabasePipeline:
                 for key, value in company_data.items():
                     if value and hasattr(company, key):
                         setattr(company, key, value)
-                company.updated_at = func.now()
+                # Re-scraped unchanged companies keep their updated_at and stay out of the change feed
+                if session.is_modified(company):
+                    company.updated_at = func.now()
+                    record_changes(session, 'companies', 'update', [company.id])
             else:
                 # Create new company
                 company = Company(**company_data)
                 session.add(company)
                 session.flush()  # Get the ID
+                record_changes(session, 'companies', 'insert', [company.id])
             
             # Store monthly data
             monthly_data = MonthlyData(
@@ -108,6 +145,9 @@ class DatabasePipeline:
             )
             session.add(monthly_data)
             
+            # Typed time-series row for history and trend queries
+            record_company_metric(session, company.id, month_key, company_data)
+            
             logger.info(f"Processed company: {company.name} from query: {query_name}")
             
         except Exception as e:
@@ -145,12 +185,15 @@ class DatabasePipeline:
                 for key, value in contact_data.items():
                     if value and hasattr(contact, key):
                         setattr(contact, key, value)
+                if session.is_modified(contact):
+                    record_changes(session, 'contacts', 'update', [contact.id])
             else:
                 # Create new contact
                 contact_data['company_id'] = company.id
                 contact = Contact(**contact_data)
                 session.add(contact)
                 session.flush()  # Get the ID
+                record_changes(session, 'contacts', 'insert', [contact.id])
             
             # Store monthly data
             monthly_data = MonthlyData(
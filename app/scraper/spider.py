@@ -274,6 +274,13 @@ class GoogleMapsSpider(scrapy.Spider):
                 'source': 'Google Maps'
             }
             
+            # Coordinates are embedded in the place URL
+            latitude, longitude = self.extract_coordinates(
+                listing.css(selectors.get('business_link', 'a[href*="/maps/place/"]::attr(href)')).get()
+            )
+            business_data['latitude'] = latitude
+            business_data['longitude'] = longitude
+            
             # Clean and validate data
             business_data = {k: v for k, v in business_data.items() if v}
             
@@ -332,6 +339,21 @@ class GoogleMapsSpider(scrapy.Spider):
             pass
         return None
     
+    def extract_coordinates(self, place_url):
+        """Extract (latitude, longitude) from a Google Maps place URL"""
+        if not place_url:
+            return None, None
+        # "!3d<lat>!4d<lon>" marks the place itself, "@<lat>,<lon>" the map centre
+        match = re.search(r'!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)', place_url)
+        if not match:
+            match = re.search(r'@(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)', place_url)
+        if not match:
+            return None, None
+        latitude, longitude = float(match.group(1)), float(match.group(2))
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return None, None
+        return latitude, longitude
+    
     def closed(self, spider):
         """Called when the spider is closed"""
         print("Spider finished, cleaning up browser...")
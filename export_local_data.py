@@ -11,7 +11,8 @@ from datetime import datetime
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 
 try:
-    from app.models.database import SessionLocal, Company, Contact, MonthlyData
+    from app.models.database import SessionLocal, init_db, Company, Contact, MonthlyData
+    from app.models.snapshots import get_published_months
     print("✅ Database models imported successfully")
 except ImportError as e:
     print(f"❌ Error importing database models: {e}")
@@ -21,6 +22,13 @@ def export_data():
     """Export all data from local database to JSON"""
     print("📤 Exporting data from local database...")
     
+    # Apply pending migrations and seed snapshot pointers on an older database
+    try:
+        init_db(retries=1)
+    except Exception as e:
+        print(f"❌ Database connection error: {e}")
+        return None
+    
     db = SessionLocal()
     try:
         # Get all companies
@@ -34,6 +42,7 @@ def export_data():
         # Get all monthly data
         monthly_data = db.query(MonthlyData).all()
         print(f"Found {len(monthly_data)} monthly data entries")
+        published_months = get_published_months(db)
         
         # Convert to dictionaries
         companies_data = []
@@ -80,7 +89,8 @@ def export_data():
                 'source_url': data.source_url,
                 'query_name': data.query_name,
                 'scraped_at': data.scraped_at.isoformat() if data.scraped_at else None,
-                'is_active': data.is_active
+                # Active means the row's month is its query's published snapshot
+                'is_active': published_months.get(data.query_name) == data.month_key
             })
         
         # Create export data
@@ -14,7 +14,8 @@ from datetime import datetime
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 
 try:
-    from app.models.database import SessionLocal, Company, Contact, MonthlyData
+    from app.models.database import SessionLocal, init_db, Company, Contact, MonthlyData
+    from app.models.snapshots import get_published_months
     DATABASE_AVAILABLE = True
 except ImportError as e:
     st.error(f"Database import error: {e}")
@@ -50,6 +51,15 @@ def main():
     # Debug info
     st.sidebar.info("✅ Using render_dashboard.py (Render Optimized)")
     
+    # Create missing tables (no-op after the first run of this process)
+    global DATABASE_AVAILABLE
+    if DATABASE_AVAILABLE:
+        try:
+            init_db(retries=1)
+        except Exception as e:
+            st.error(f"Database connection error: {e}")
+            DATABASE_AVAILABLE = False
+    
     
     # Show last scraping info
     st.sidebar.markdown("---")
@@ -113,6 +123,7 @@ def main():
         
         # Get monthly data
         monthly_data = db.query(MonthlyData).all()
+        published_months = get_published_months(db)
         
         # Display metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -166,7 +177,7 @@ def main():
                     "Query": data.query_name or "N/A",
                     "Source URL": data.source_url or "N/A",
                     "Scraped At": data.scraped_at.strftime("%Y-%m-%d %H:%M:%S") if data.scraped_at else "N/A",
-                    "Active": data.is_active
+                    "Active": published_months.get(data.query_name) == data.month_key
                 })
             
             monthly_df = pd.DataFrame(monthly_data_list)
@@ -10,7 +10,8 @@ import os
 import sys
 import yaml
 from datetime import datetime
-from app.models.database import SessionLocal, Company, Contact, MonthlyData
+from app.models.database import SessionLocal, init_db, Company, Contact, MonthlyData
+from app.models.snapshots import get_published_months
 
 def load_config():
     """Load scraping configuration"""
@@ -104,7 +105,9 @@ def main():
     """Simple dashboard that reads directly from database"""
     st.title("📊 LeadTool Dashboard")
     st.markdown("Unified Lead Generation and Management System")
-        
+    
+    # Create missing tables (no-op after the first run of this process)
+    init_db()
     
     # Show last scraping info
     st.sidebar.markdown("---")
@@ -193,6 +196,7 @@ def main():
         
         # Get monthly data
         monthly_data = db.query(MonthlyData).all()
+        published_months = get_published_months(db)
         
         # Display metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -246,7 +250,7 @@ def main():
                     "Query": data.query_name or "N/A",
                     "Source URL": data.source_url or "N/A",
                     "Scraped At": data.scraped_at.strftime("%Y-%m-%d %H:%M:%S") if data.scraped_at else "N/A",
-                    "Active": data.is_active
+                    "Active": published_months.get(data.query_name) == data.month_key
                 })
             
             monthly_df = pd.DataFrame(monthly_data_list)
@@ -307,7 +311,7 @@ def main():
             st.metric("Total Scraped Items", total_scraped)
         
         with col2:
-            active_items = len([d for d in monthly_data if d.is_active])
+            active_items = len([d for d in monthly_data if published_months.get(d.query_name) == d.month_key])
             st.metric("Active Items", active_items)
         
         with col3:
@@ -325,7 +329,7 @@ def main():
                     "Time": data.scraped_at.strftime("%Y-%m-%d %H:%M:%S") if data.scraped_at else "Unknown",
                     "Query": data.query_name or "Unknown",
                     "Type": data.data_type,
-                    "Active": "✅" if data.is_active else "❌"
+                    "Active": "✅" if published_months.get(data.query_name) == data.month_key else "❌"
                 })
             
             activity_df = pd.DataFrame(activity_data)
@@ -0,0 +1,51 @@
+"""
+Shared fixtures: a throwaway SQLite database with the full LeadTool schema
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models.database import configure_engine, create_schema
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Engine on a fresh SQLite file with the schema, migrations and indexes applied"""
+    engine = configure_engine(create_engine(f"sqlite:///{tmp_path / 'leadtool.db'}"))
+    create_schema(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    """Session bound to the test engine"""
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def explain(session):
+    """EXPLAIN QUERY PLAN detail lines for an ORM query"""
+    def explain(query):
+        compiled = query.statement.compile(dialect=session.bind.dialect)
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        return [row[-1] for row in session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)]
+    return explain
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """TestClient for the API on a fresh SQLite file"""
+    from fastapi.testclient import TestClient
+
+    from app.models import database
+
+    monkeypatch.setattr(database, 'DATABASE_URL', f"sqlite:///{tmp_path / 'api.db'}")
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_schema_ready', False)
+
+    from app.main import app
+    with TestClient(app) as client:
+        yield client
+    database.get_engine().dispose()
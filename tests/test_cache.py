@@ -0,0 +1,24 @@
+"""
+Response cache: cached entries must not carry another request's CORS headers
+"""
+
+
+def test_cors_headers_follow_each_request_origin(client):
+    fill = client.get('/api/v1/contacts', headers={'Origin': 'http://x.com'})
+    assert fill.headers['x-cache'] == 'MISS'
+
+    hit = client.get('/api/v1/contacts', headers={'Origin': 'http://y.com'})
+    assert hit.headers['x-cache'] == 'HIT'
+    assert hit.headers['access-control-allow-origin'] == 'http://y.com'
+
+    no_origin = client.get('/api/v1/contacts')
+    assert no_origin.headers['x-cache'] == 'HIT'
+    assert 'access-control-allow-origin' not in no_origin.headers
+
+
+def test_not_modified_carries_cors_headers(client):
+    etag = client.get('/api/v1/contacts').headers['etag']
+
+    response = client.get('/api/v1/contacts', headers={'Origin': 'http://y.com', 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['access-control-allow-origin'] == 'http://y.com'
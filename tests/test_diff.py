@@ -0,0 +1,40 @@
+"""
+Month-over-month company diff
+"""
+import json
+
+from app.models.database import Company
+from app.models.diff import iter_month_diff
+from app.models.metrics import record_company_metric
+
+
+def _diff(session, from_month, to_month):
+    return [json.loads(line) for line in iter_month_diff(session, from_month, to_month)]
+
+
+def test_phone_number_change_is_reported(session):
+    company = Company(name="Cabot Plumbing")
+    session.add(company)
+    session.flush()
+    record_company_metric(session, company.id, '2025-01', {'rating': '4.5', 'phone': '555-0100'})
+    record_company_metric(session, company.id, '2025-02', {'rating': '4.5', 'phone': '555-0199'})
+    session.commit()
+
+    assert _diff(session, '2025-01', '2025-02') == [{
+        'change': 'changed',
+        'company_id': company.id,
+        'name': "Cabot Plumbing",
+        'address': None,
+        'fields': {'phone': {'from': '555-0100', 'to': '555-0199'}},
+    }]
+
+
+def test_unchanged_company_is_not_reported(session):
+    company = Company(name="Cabot Plumbing")
+    session.add(company)
+    session.flush()
+    for month_key in ('2025-01', '2025-02'):
+        record_company_metric(session, company.id, month_key, {'review_count': '12', 'phone': '555-0100'})
+    session.commit()
+
+    assert _diff(session, '2025-01', '2025-02') == []
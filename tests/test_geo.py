@@ -0,0 +1,30 @@
+"""
+Radius search: bounding boxes and geohash cells across the antimeridian
+"""
+import pytest
+
+from app.models.geo import bounding_box, covering_cells, encode_geohash
+
+
+def test_bounding_box_splits_at_the_antimeridian():
+    min_lat, max_lat, lon_ranges = bounding_box(0.0, 179.99, 5.0)
+    assert min_lat == pytest.approx(-0.0449, abs=1e-4) and max_lat == pytest.approx(0.0449, abs=1e-4)
+    (east_min, east_max), (west_min, west_max) = lon_ranges
+    assert east_max == 180.0 and east_min == pytest.approx(179.945, abs=1e-3)
+    assert west_min == -180.0 and west_max == pytest.approx(-179.965, abs=1e-3)
+
+    assert bounding_box(0.0, 10.0, 5.0)[2] == [(pytest.approx(9.955, abs=1e-3), pytest.approx(10.045, abs=1e-3))]
+
+
+def test_covering_cells_include_both_sides():
+    cells = covering_cells(0.0, 179.99, 5.0)
+    for lon in (179.98, -179.98):
+        assert any(encode_geohash(0.0, lon).startswith(cell) for cell in cells)
+
+
+def test_nearby_finds_companies_across_the_antimeridian(client):
+    for name, lon in (("East", 179.99), ("West", -179.99), ("Far", -179.5)):
+        client.post('/api/v1/companies', json={'name': name, 'latitude': 0.0, 'longitude': lon})
+
+    nearby = client.get('/api/v1/companies/nearby', params={'lat': 0.0, 'lon': 179.995, 'radius_km': 5}).json()
+    assert [(company['name'], round(company['distance_km'], 2)) for company in nearby] == [("East", 0.56), ("West", 1.67)]
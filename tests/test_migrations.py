@@ -0,0 +1,80 @@
+"""
+In-place migrations of databases created by earlier LeadTool versions
+"""
+import sqlite3
+
+import pytest
+from sqlalchemy import Float, create_engine, inspect, text
+
+from app.models.database import configure_engine, create_schema
+from app.models.search import ensure_fulltext_indexes
+
+# companies and contacts as created before rating became numeric
+LEGACY_SCHEMA = [
+    """CREATE TABLE companies (
+        id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, domain VARCHAR(255), description TEXT,
+        website VARCHAR(500), industry VARCHAR(100), size VARCHAR(50), location VARCHAR(255),
+        category VARCHAR(100), address TEXT, phone VARCHAR(50), rating VARCHAR(10), review_count INTEGER,
+        source VARCHAR(50), created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME
+    )""",
+    """CREATE TABLE contacts (
+        id INTEGER PRIMARY KEY, company_id INTEGER NOT NULL REFERENCES companies (id), phone VARCHAR(50),
+        first_name VARCHAR(100), last_name VARCHAR(100), title VARCHAR(100), department VARCHAR(100),
+        address TEXT, linkedin VARCHAR(500), is_primary BOOLEAN, created_at DATETIME, updated_at DATETIME
+    )""",
+    "INSERT INTO companies (id, name, industry, rating) VALUES (1, 'Cabot Plumbing', 'Plumbing', '4,5'), (2, 'Zed', 'Music', 'n/a')",
+    "INSERT INTO contacts (id, company_id, phone) VALUES (1, 1, '555-0100')",
+]
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = configure_engine(create_engine(f"sqlite:///{tmp_path / 'legacy.db'}"))
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+        # Full-text tables from an earlier upgrade, with triggers on the old table
+        ensure_fulltext_indexes(conn)
+    yield engine
+    engine.dispose()
+
+
+def _use_sqlite_version(monkeypatch, sqlite_version):
+    if sqlite_version >= (3, 35, 0) and sqlite3.sqlite_version_info < (3, 35, 0):
+        pytest.skip("DROP COLUMN needs SQLite 3.35")
+    # Older SQLite takes the table rebuild path
+    monkeypatch.setattr(sqlite3, 'sqlite_version_info', sqlite_version)
+
+
+@pytest.mark.parametrize("sqlite_version", [sqlite3.sqlite_version_info, (3, 31, 1)])
+def test_rating_becomes_numeric(legacy_engine, monkeypatch, sqlite_version):
+    _use_sqlite_version(monkeypatch, sqlite_version)
+
+    create_schema(legacy_engine)
+
+    rating = next(column for column in inspect(legacy_engine).get_columns('companies') if column['name'] == 'rating')
+    assert isinstance(rating['type'], Float)
+    with legacy_engine.begin() as conn:
+        assert conn.execute(text("SELECT id, rating FROM companies ORDER BY id")).all() == [(1, 4.5), (2, None)]
+        assert conn.execute(text("SELECT company_id FROM contacts")).scalars().all() == [1]
+        assert conn.execute(text("PRAGMA foreign_key_check")).all() == []
+
+        # Full-text sync triggers still fire for new rows
+        conn.execute(text("INSERT INTO companies (id, name) VALUES (3, 'Abbey Road Studios')"))
+        assert conn.execute(text("SELECT rowid FROM companies_fts WHERE companies_fts MATCH 'abbey'")).scalars().all() == [3]
+
+
+@pytest.mark.parametrize("sqlite_version", [sqlite3.sqlite_version_info, (3, 31, 1)])
+def test_rating_text_is_parsed_like_new_scrapes(legacy_engine, monkeypatch, sqlite_version):
+    _use_sqlite_version(monkeypatch, sqlite_version)
+    with legacy_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO companies (id, name, rating) VALUES "
+            "(3, 'Stars', '4.5 stars'), (4, 'Blank', ''), (5, 'Rated', 'Rating: 3,8/5'), (6, 'Padded', ' 5 ')"
+        ))
+
+    create_schema(legacy_engine)
+
+    with legacy_engine.connect() as conn:
+        ratings = dict(conn.execute(text("SELECT id, rating FROM companies")).all())
+    assert ratings == {1: 4.5, 2: None, 3: 4.5, 4: None, 5: 3.8, 6: 5.0}
@@ -0,0 +1,37 @@
+"""
+Request profiling: one profiled request at a time, since samples are process-wide
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.monitoring.profiling import ProfilingMiddleware
+
+
+def _client(tmp_path):
+    app = FastAPI()
+
+    @app.get('/ping')
+    async def ping():
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware, token='secret', output_dir=str(tmp_path))
+    return TestClient(app)
+
+
+def test_profiled_request_writes_profile(tmp_path):
+    response = _client(tmp_path).get('/ping', headers={'X-Profile': 'secret'})
+    assert response.status_code == 200
+    assert (tmp_path / f"{response.headers['x-profile-id']}.json").exists()
+
+
+def test_concurrent_profiling_is_rejected(tmp_path):
+    client = _client(tmp_path)
+    client.get('/ping')  # build the middleware stack
+    middleware = client.app.middleware_stack
+    while not isinstance(middleware, ProfilingMiddleware):
+        middleware = middleware.app
+
+    with middleware.busy:
+        assert client.get('/ping', headers={'X-Profile': 'secret'}).status_code == 409
+        assert client.get('/ping').status_code == 200
+    assert client.get('/ping', headers={'X-Profile': 'secret'}).status_code == 200
@@ -0,0 +1,69 @@
+"""
+Statistics rollups: seeded with the schema, refreshed by API writes, read without writing
+"""
+from app.models.database import Company, Contact, StatRollup
+from app.models.rollups import read_rollup, refresh_after_write, rollup_total
+
+
+def test_schema_bootstrap_seeds_rollups(session):
+    assert {entity for (entity,) in session.query(StatRollup.entity).distinct()} == {'companies', 'contacts'}
+    dimensions, refreshed_at = read_rollup(session, 'companies')
+    assert rollup_total(dimensions) == 0
+    assert refreshed_at is not None
+
+
+def test_read_rollup_does_not_write(session):
+    session.query(StatRollup).delete()
+    session.commit()
+
+    assert read_rollup(session, 'contacts') == ({}, None)
+    assert session.query(StatRollup).count() == 0
+
+
+def test_refresh_after_write_counts_pending_rows(session):
+    company = Company(name="Cabot Plumbing", industry="Plumbing")
+    session.add(company)
+    session.flush()
+    session.add(Contact(company_id=company.id, phone="555-0100"))
+    refresh_after_write(session, ['companies', 'contacts'])
+    session.commit()
+
+    companies, _ = read_rollup(session, 'companies')
+    contacts, _ = read_rollup(session, 'contacts')
+    assert rollup_total(companies) == 1
+    assert companies['industry'] == [("Plumbing", 1)]
+    assert rollup_total(contacts, 'with_phone') == 1
+
+
+def _stats(client):
+    return client.get('/api/v1/companies/stats').json(), client.get('/api/v1/contacts/stats').json()
+
+
+def test_single_row_writes_match_a_full_refresh(client):
+    from app.models.database import MonthlyData, SessionLocal, get_engine
+    from app.models.rollups import refresh_rollups
+
+    acme = client.post('/api/v1/companies', json={'name': "Acme", 'industry': "Plumbing"}).json()
+    cabot = client.post('/api/v1/companies', json={'name': "Cabot", 'industry': "Plumbing"}).json()
+    client.put(f"/api/v1/companies/{cabot['id']}", json={'industry': "Heating", 'location': "Leeds"})
+    contact = client.post('/api/v1/contacts', json={'company_id': acme['id'], 'title': "Owner"}).json()
+    client.put(f"/api/v1/contacts/{contact['id']}", json={'phone': "555-0100", 'title': "Manager"})
+    client.post('/api/v1/contacts', json={'company_id': cabot['id'], 'title': "Owner", 'phone': "555-0199"})
+    with SessionLocal() as session:
+        session.add(MonthlyData(company_id=cabot['id'], month_key='2025-01', data_type='company'))
+        session.commit()
+    with get_engine().begin() as conn:
+        refresh_rollups(conn)
+    client.delete(f"/api/v1/companies/{cabot['id']}")
+    client.delete(f"/api/v1/contacts/{contact['id']}")
+
+    companies, contacts = _stats(client)
+    assert companies['total_companies'] == 1
+    assert companies['by_industry'] == [{'industry': "Plumbing", 'count': 1}]
+    assert companies['by_location'] == [] and companies['by_month'] == []
+    assert (contacts['total_contacts'], contacts['contacts_with_phones'], contacts['by_title']) == (0, 0, [])
+
+    with get_engine().begin() as conn:
+        refresh_rollups(conn)
+    assert _stats(client)[0] | {'refreshed_at': None} == companies | {'refreshed_at': None}
+    assert _stats(client)[1] | {'refreshed_at': None} == contacts | {'refreshed_at': None}
@@ -0,0 +1,55 @@
+"""
+Text filter match modes and their index usage (SQLite trigram side tables)
+"""
+import pytest
+
+from app.models.database import Company
+from app.models.search import apply_text_filter, text_match_mode
+
+
+@pytest.fixture
+def companies(session):
+    session.add_all([
+        Company(name="Cabot Plumbing", industry="Plumbing"),
+        Company(name="Abbey Road Studios", industry="Music"),
+        Company(name="Zed", industry="Plumbing Supplies"),
+    ])
+    session.commit()
+    return session
+
+
+def _filter(session, column_name, value):
+    return apply_text_filter(session.query(Company.id, Company.name), Company, column_name, value, 'sqlite')
+
+
+@pytest.mark.parametrize("value, expected", [
+    ('"Zed"', ('exact', 'Zed')),
+    ('Cab*', ('prefix', 'Cab')),
+    ('abo', ('substring', 'abo')),
+    ('ab', ('substring', 'ab')),
+])
+def test_text_match_mode(value, expected):
+    assert text_match_mode(value) == expected
+
+
+@pytest.mark.parametrize("column_name, value, names, index", [
+    ('name', '"Zed"', ["Zed"], 'idx_company_name_lower (<expr>=?)'),
+    ('industry', '"plumbing"', ["Cabot Plumbing"], 'idx_company_industry_lower (<expr>=?)'),
+    ('name', 'Cab*', ["Cabot Plumbing"], 'companies_trgm VIRTUAL TABLE INDEX'),
+    ('name', 'road', ["Abbey Road Studios"], 'companies_trgm VIRTUAL TABLE INDEX'),
+    ('industry', 'umbing', ["Cabot Plumbing", "Zed"], 'companies_trgm VIRTUAL TABLE INDEX'),
+])
+def test_match_modes_use_an_index(companies, explain, column_name, value, names, index):
+    query = _filter(companies, column_name, value)
+
+    assert sorted(row.name for row in query) == names
+    assert any(index in line for line in explain(query))
+
+
+def test_short_values_still_match_as_substring(companies):
+    assert sorted(row.name for row in _filter(companies, 'name', 'ab')) == ["Abbey Road Studios", "Cabot Plumbing"]
+
+
+def test_every_mode_ignores_case(companies):
+    for value in ('"abbey road studios"', 'ABBEY*', 'ROAD'):
+        assert [row.name for row in _filter(companies, 'name', value)] == ["Abbey Road Studios"]
@@ -0,0 +1,45 @@
+"""
+Slow-query log: capturing a plan must not disturb the caller's statement or transaction
+"""
+from sqlalchemy import text
+
+from app.monitoring.slow_queries import SlowQueryRecorder
+
+
+def _recorder(tmp_path):
+    return SlowQueryRecorder(threshold_ms=0, log_path=str(tmp_path / 'slow.log'))
+
+
+def test_plan_leaves_pending_rows_and_transaction_intact(engine, tmp_path):
+    recorder = _recorder(tmp_path)
+    with engine.connect() as conn:
+        conn.execute(text("INSERT INTO companies (name) VALUES ('Acme'), ('Globex')"))
+        result = conn.execute(text("SELECT name FROM companies ORDER BY name"))
+        cursor = result.cursor
+
+        plan = recorder.explain_plan(conn, cursor, "SELECT name FROM companies ORDER BY name", (), False)
+        assert 'companies' in plan
+        assert [row.name for row in result] == ['Acme', 'Globex']
+
+        # The insert is still uncommitted and can be rolled back
+        conn.rollback()
+        assert conn.execute(text("SELECT count(*) FROM companies")).scalar() == 0
+
+
+def test_failed_plan_does_not_abort_the_transaction(engine, tmp_path):
+    recorder = _recorder(tmp_path)
+    with engine.connect() as conn:
+        conn.execute(text("INSERT INTO companies (name) VALUES ('Acme')"))
+        cursor = conn.connection.dbapi_connection.cursor()
+
+        assert recorder.explain_plan(conn, cursor, "SELECT * FROM no_such_table", (), False).startswith('EXPLAIN failed')
+        assert conn.execute(text("SELECT count(*) FROM companies")).scalar() == 1
+
+
+def test_only_queries_and_dml_are_explained(engine, tmp_path):
+    recorder = _recorder(tmp_path)
+    with engine.connect() as conn:
+        cursor = conn.connection.dbapi_connection.cursor()
+        for statement in ("PRAGMA table_info(companies)", "CREATE TABLE t (id INTEGER)", "VACUUM", ""):
+            assert recorder.explain_plan(conn, cursor, statement, (), False) is None
+        assert recorder.explain_plan(conn, cursor, "  delete FROM companies WHERE id = ?", (1,), False)
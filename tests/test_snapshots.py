@@ -0,0 +1,43 @@
+"""
+Published-month filtering through the active_snapshots pointers
+"""
+import pytest
+
+from app.models.database import Company, MonthlyData
+from app.models.snapshots import filter_active_month, publish_month
+
+
+@pytest.fixture
+def published(session):
+    """A company found by three queries in 2025-01 and one query in 2025-02; 2025-01 is published"""
+    cabot = Company(name="Cabot Plumbing")
+    zed = Company(name="Zed")
+    session.add_all([cabot, zed])
+    session.flush()
+    session.add_all([
+        MonthlyData(company_id=cabot.id, month_key='2025-01', data_type='company', query_name=query_name)
+        for query_name in ('plumbers', 'heating', 'bathrooms')
+    ])
+    session.add(MonthlyData(company_id=zed.id, month_key='2025-02', data_type='company', query_name='plumbers'))
+    session.commit()
+    publish_month(session, '2025-01')
+    return session
+
+
+def test_one_row_per_company(published):
+    rows = filter_active_month(published.query(Company.name), '2025-01').all()
+
+    assert [row.name for row in rows] == ["Cabot Plumbing"]
+
+
+def test_unpublished_month_is_empty(published):
+    assert filter_active_month(published.query(Company.name), '2025-02').all() == []
+
+
+def test_month_probe_reads_only_the_index(published, explain):
+    plan = explain(filter_active_month(published.query(Company.id), '2025-01'))
+
+    assert any(
+        'USING COVERING INDEX idx_monthly_company_month_type_query (company_id=? AND month_key=?)' in line
+        for line in plan
+    ), plan